@@ -3,8 +3,13 @@ import pandas as pd
 from scipy.stats import ks_2samp, entropy
 import shap
 from sklearn.ensemble import RandomForestRegressor
+from mmd_detector import MMDDetector
+from fingerprint_index import pack_bits
 
 class DriftEngine:
+    MMD_KEY = "Joint_MMD"
+    FINGERPRINT_LEVELS = ("drift", "medium", "high")
+
     def __init__(self, reference_data: pd.DataFrame):
         self.reference_data = reference_data
         self.numeric_features = reference_data.select_dtypes(include=[np.number]).columns.tolist()
@@ -29,6 +34,13 @@ class DriftEngine:
         }
         self.default_weight = 0.1
 
+        # --- MULTIVARIATE DRIFT (RFF-MMD) ---
+        # KS looks at one feature at a time; MMD catches joint shifts
+        # (e.g. Helmet and Vest confidences decoupling) on all features together.
+        self.mmd_key = self.MMD_KEY
+        self.mmd_weight = 0.40
+        self.mmd_detector = MMDDetector(self.reference_data[self.numeric_features])
+
         # --- ROBUSTNESS UPGRADE: SMOOTHING (EMA) ---
         # Prevents the alarm from flickering on/off.
         self.ema_score = 0.0
@@ -83,6 +95,15 @@ class DriftEngine:
                 "severity": "High" if stat > 0.3 else ("Medium" if stat > 0.1 else "Low")
             }
 
+        # 2b. Joint (Multivariate) Drift
+        mmd_cols = self.mmd_detector.columns
+        if all(col in current_data.columns for col in mmd_cols):
+            mmd_result = self.mmd_detector.check(current_data[mmd_cols])
+            if mmd_result["drift_detected"]:
+                weighted_drift_sum += mmd_result["distance"] * self.mmd_weight
+            total_weight += self.mmd_weight
+            drift_report[self.mmd_key] = mmd_result
+
         # 3. Calculate Weighted Score
         raw_score = (weighted_drift_sum / total_weight) * 100 if total_weight > 0 else 0
         final_instant_score = min(100, raw_score * 2.0)
@@ -199,11 +220,14 @@ class DriftEngine:
             col: self.reference_data[col].std() * 3 for col in self.numeric_features
         }
         
-        # 3. Refill the Risk Budget (The Leaky Bucket)
+        # 3. Re-fit the MMD random features and reference embedding
+        self.mmd_detector.fit(self.reference_data[self.numeric_features])
+
+        # 4. Refill the Risk Budget (The Leaky Bucket)
         self.risk_budget = self.max_budget
         self.ema_score = 0.0 # Reset smoothing history
         
-        # 4. Re-Initialize SHAP (Because the baseline distribution changed)
+        # 5. Re-Initialize SHAP (Because the baseline distribution changed)
         # We need to retrain the shadow model to understand the new "Normal" relationships
         self._init_shap_explainer()
         
@@ -217,4 +241,23 @@ class DriftEngine:
                 fingerprint.append(1)
             else:
                 fingerprint.append(0)
-        return fingerprint
\ No newline at end of file
+        return fingerprint
+
+    # --- INNOVATION 1b: PACKED SIGNATURE (for the incident index) ---
+    @classmethod
+    def fingerprint_layout(cls, features):
+        """Bit names of get_packed_fingerprint, in order."""
+        return [f"{col}:{level}" for col in list(features) + [cls.MMD_KEY] for level in cls.FINGERPRINT_LEVELS]
+
+    def get_packed_fingerprint(self, drift_report):
+        """
+        Drift signature + severity, packed into uint64 words.
+        Per feature (and the joint MMD test): [drifted, severity >= Medium, severity == High],
+        so the Hamming distance also grows with how far apart the severities are.
+        """
+        bits = []
+        for col in self.numeric_features + [self.mmd_key]:
+            entry = drift_report.get(col, {})
+            severity = entry.get("severity", "Low")
+            bits += [bool(entry.get("drift_detected", False)), severity in ("Medium", "High"), severity == "High"]
+        return pack_bits(bits)
\ No newline at end of file
@@ -0,0 +1,173 @@
+import json
+import os
+import time
+import numpy as np
+
+# --- INNOVATION: DRIFT MEMORY ---
+# Packed drift fingerprints of past incidents, each with its root cause and
+# resolution. A new fingerprint is XOR-ed against every stored one and the
+# set bits are counted (Hamming distance), so "have we seen this before?"
+# is a handful of vectorised passes over a (N, words) uint64 array.
+
+def pack_bits(bits):
+    """List of 0/1 (or bools) -> 1-D uint64 array, zero padded to whole words."""
+    bits = np.asarray(bits, dtype=np.uint8)
+    n_words = max(1, -(-len(bits) // 64))
+    padded = np.zeros(n_words * 64, dtype=np.uint8)
+    padded[:len(bits)] = bits
+    return np.packbits(padded).view(">u8").astype(np.uint64)
+
+def unpack_bits(words, n_bits):
+    """Inverse of pack_bits -> list of 0/1 ints."""
+    words = np.asarray(words, dtype=np.uint64).astype(">u8")
+    return np.unpackbits(words.view(np.uint8))[:n_bits].tolist()
+
+if hasattr(np, "bitwise_count"):  # numpy >= 2.0: hardware popcount
+    def popcount(words, out=None):
+        return np.bitwise_count(words, out=out)
+else:
+    def popcount(words, out=None):
+        # SWAR popcount on uint64 (no per-byte lookup tables)
+        w = words - ((words >> np.uint64(1)) & np.uint64(0x5555555555555555))
+        w = (w & np.uint64(0x3333333333333333)) + ((w >> np.uint64(2)) & np.uint64(0x3333333333333333))
+        w = (w + (w >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+        w = (w * np.uint64(0x0101010101010101)) >> np.uint64(56)
+        if out is None:
+            return w.astype(np.uint8)
+        out[...] = w
+        return out
+
+class FingerprintIndex:
+    """
+    Append-only incident store on disk:
+        codes.bin        raw uint64 words, one fixed-width row per incident
+        incidents.jsonl  one JSON line per incident (same order)
+        meta.json        bit layout, so a changed feature set is not mixed in
+    """
+    def __init__(self, directory, n_bits, layout=None):
+        self.directory = directory
+        self.n_bits = n_bits
+        self.n_words = max(1, -(-n_bits // 64))
+        self.layout = layout or []
+
+        self.codes_path = os.path.join(directory, "codes.bin")
+        self.incidents_path = os.path.join(directory, "incidents.jsonl")
+        self.meta_path = os.path.join(directory, "meta.json")
+
+        self._codes = np.zeros((1024, self.n_words), dtype=np.uint64)
+        self._xor = np.empty_like(self._codes)             # Scratch buffers for search()
+        self._bits = np.empty(self._codes.shape, dtype=np.uint8)
+        self.count = 0
+        self.incidents = []
+        self._incidents_offset = 0  # Bytes of incidents.jsonl already loaded
+        self._check_layout()
+        self.refresh()
+
+    # --- 1. PERSISTENCE ---
+    def _check_layout(self):
+        os.makedirs(self.directory, exist_ok=True)
+        meta = {"n_bits": self.n_bits, "layout": self.layout}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                stored = json.load(f)
+            if stored != meta:
+                raise ValueError(f"Fingerprint layout changed ({stored['n_bits']} -> {self.n_bits} bits). "
+                                 f"Move {self.directory} aside to start a new index.")
+        else:
+            with open(self.meta_path, "w") as f:
+                json.dump(meta, f)
+
+    def refresh(self):
+        """Loads rows appended since the last call (by this or another process)."""
+        row_bytes = 8 * self.n_words
+        if not os.path.exists(self.codes_path) or not os.path.exists(self.incidents_path):
+            return
+        n_codes = os.path.getsize(self.codes_path) // row_bytes
+        if n_codes <= self.count:
+            return
+
+        with open(self.codes_path, "rb") as f:
+            f.seek(self.count * row_bytes)
+            codes = np.frombuffer(f.read((n_codes - self.count) * row_bytes), dtype=np.uint64)
+        codes = codes.reshape(-1, self.n_words)
+
+        incidents = []
+        with open(self.incidents_path, "rb") as f:
+            f.seek(self._incidents_offset)
+            for line in f:
+                if not line.endswith(b"\n"): break  # Torn last line (crash / writer mid-append)
+                incidents.append(json.loads(line))
+                self._incidents_offset += len(line)
+                if len(incidents) == len(codes): break
+
+        # Only rows that made it into both files count
+        n = len(incidents)
+        self._reserve(self.count + n)
+        self._codes[self.count:self.count + n] = codes[:n]
+        self.count += n
+        self.incidents.extend(incidents)
+
+    def _reserve(self, n):
+        if n > len(self._codes):
+            grown = np.zeros((max(n, 2 * len(self._codes)), self.n_words), dtype=np.uint64)
+            grown[:self.count] = self._codes[:self.count]
+            self._codes = grown
+            self._xor = np.empty_like(grown)
+            self._bits = np.empty(grown.shape, dtype=np.uint8)
+
+    # --- 2. INSERT ---
+    def add(self, code, root_cause, resolution, **details):
+        """
+        Appends one incident. Callers running several processes must serialise
+        add() themselves (main.py does it inside the shared-state transaction).
+        """
+        self.refresh()
+        code = np.asarray(code, dtype=np.uint64).reshape(self.n_words)
+        incident = {"id": self.count, "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "root_cause": root_cause, "resolution": resolution, **details}
+
+        # Code first, then metadata. Leftovers of a crashed append are cut off first.
+        with open(self.codes_path, "ab") as f:
+            f.truncate(self.count * 8 * self.n_words)
+            f.write(code.tobytes())
+        line = (json.dumps(incident) + "\n").encode()
+        with open(self.incidents_path, "ab") as f:
+            f.truncate(self._incidents_offset)
+            f.write(line)
+        self._incidents_offset += len(line)
+
+        self._reserve(self.count + 1)
+        self._codes[self.count] = code
+        self.count += 1
+        self.incidents.append(incident)
+        return incident
+
+    # --- 3. NEAREST NEIGHBOURS ---
+    def search(self, code, k=5, max_distance=None):
+        """k most similar past incidents (Hamming distance over the packed bits)."""
+        self.refresh()
+        if self.count == 0:
+            return []
+        n = self.count
+        code = np.asarray(code, dtype=np.uint64).reshape(1, self.n_words)
+        xor = np.bitwise_xor(self._codes[:n], code, out=self._xor[:n])
+        bits = popcount(xor, out=self._bits[:n])
+        dist = bits[:, 0] if self.n_words == 1 else bits.sum(axis=1, dtype=np.uint16)
+
+        # Distances are small integers, so widen a cut-off from the minimum
+        # instead of a full argpartition (several times slower at 10^5 rows)
+        k = min(k, n)
+        cut = int(dist.min())
+        while np.count_nonzero(dist <= cut) < k:
+            cut += 1
+        closer = np.flatnonzero(dist < cut)
+        closer = closer[np.argsort(dist[closer], kind="stable")]
+        top = np.concatenate([closer, np.flatnonzero(dist == cut)[:k - len(closer)]])
+
+        matches = []
+        for i in top:
+            d = int(dist[i])
+            if max_distance is not None and d > max_distance: break
+            matches.append({**self.incidents[i], "distance": d,
+                            "similarity": round(1.0 - d / self.n_bits, 3)})
+        return matches
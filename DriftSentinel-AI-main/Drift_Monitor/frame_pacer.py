@@ -0,0 +1,92 @@
+import time
+
+class FramePacer:
+    """
+    Server side of the frame pacing protocol.
+    Tracks how many frames are in flight and how long inference takes,
+    then tells each sender how fast (and at what JPEG quality) to send so
+    that all active senders together stay within this worker's capacity.
+    Frames are counted on arrival, so the caller must not block the event
+    loop while scoring (main.py runs inference in a thread).
+    """
+    def __init__(self, max_in_flight=2, target_latency=0.25,
+                 min_interval_ms=100, max_interval_ms=2000, active_window=5.0):
+        self.max_in_flight = max_in_flight
+        self.target_latency = target_latency  # Seconds per frame we are happy with
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self.active_window = active_window    # Seconds a sender counts as active after its last frame
+
+        self.in_flight = 0
+        self.service_time = target_latency   # EWMA of processing time (seconds)
+        self.alpha = 0.2
+        self.processed = 0
+        self.rejected = 0
+        self.latest_seq = {}                  # camera_id -> newest frame sequence seen
+        self.last_seen = {}                   # sender -> monotonic time of its last frame
+
+    # --- 1. ADMISSION ---
+    def try_acquire(self, seq=None, camera_id="default", sender=None):
+        """
+        Returns a reason string if the frame should be dropped, else None.
+        Frames are dropped when the queue is full or a newer frame from the
+        same camera already arrived. `sender` (e.g. client address + camera)
+        is only used to count active senders; it defaults to camera_id.
+        """
+        self.last_seen[sender or camera_id] = time.monotonic()
+        if seq is not None and seq < self.latest_seq.get(camera_id, -1):
+            self.rejected += 1
+            return "stale"
+        if self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            return "busy"
+        if seq is not None:
+            self.latest_seq[camera_id] = seq
+        self.in_flight += 1
+        return None
+
+    def release(self, service_time=None):
+        """service_time: seconds of actual work (excluding queueing), None if the frame failed early."""
+        if service_time is not None:
+            self.service_time += (service_time - self.service_time) * self.alpha
+        self.in_flight = max(0, self.in_flight - 1)
+        self.processed += 1
+
+    # --- 2. ADVERTISEMENT ---
+    def active_senders(self):
+        cutoff = time.monotonic() - self.active_window
+        for sender in [s for s, t in self.last_seen.items() if t < cutoff]:
+            del self.last_seen[sender]
+        return max(1, len(self.last_seen))
+
+    def advice(self):
+        """Capacity hints sent back with every response."""
+        capacity_fps = 1.0 / max(self.service_time, 1e-3)
+        # Frames are scored one at a time, so every sender gets an equal share of capacity
+        senders = self.active_senders()
+        interval_ms = 1000.0 * self.service_time * senders
+        interval_ms = max(self.min_interval_ms, min(self.max_interval_ms, interval_ms))
+
+        # Slow server or long queue -> smaller payloads. Linear between target and 4x target.
+        load = self.service_time * max(1, self.in_flight) / self.target_latency
+        if load <= 1.0:
+            jpeg_quality = 0.8
+        else:
+            jpeg_quality = max(0.4, 0.8 - (load - 1.0) * (0.4 / 3.0))
+
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - 1),
+            "capacity_fps": round(capacity_fps, 2),
+            "active_senders": senders,
+            "service_time_ms": round(self.service_time * 1000.0, 1),
+            "recommended_interval_ms": int(interval_ms),
+            "jpeg_quality": round(jpeg_quality, 2),
+        }
+
+    def stats(self):
+        report = self.advice()
+        report["processed"] = self.processed
+        report["rejected"] = self.rejected
+        return report
@@ -1,12 +1,29 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import numpy as np
 import cv2
 import base64
 import os
+import sys
 import datetime
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
 from ultralytics import YOLO
+from frame_pacer import FramePacer
+from quality_features import extract_quality_features, laplacian_variance, QualityDriftStream, QUALITY_FEATURES
+from drift_engine import DriftEngine
+from fingerprint_index import FingerprintIndex, unpack_bits
+from state_store import open_state_store
+from risk_forecast import RiskForecaster
+
+# Shared helpers (frame_gate, ...) live next to sentinel_core.py, one level up
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from frame_gate import FrameGate
+from telemetry_store import TelemetryStore
 
 # --- 1. SETUP ---
 app = FastAPI()
@@ -47,15 +64,20 @@ class DriftSimulator:
         self.baseline_quality = 1.0
         self.logs = [] # <--- MEMORY STORAGE
 
-    def update(self, q_flag, r_blur, r_bright):
+    def update(self, q_flag, r_blur, r_bright, stat_risk=None, stat_cause=None):
         # 1. Risk Calc
         sim_risk = max(0.0, (self.baseline_quality - q_flag) * 100.0)
         
         real_risk = 0.0
-        if r_bright < self.baseline_bright: 
-            real_risk = (self.baseline_bright - r_bright) * 1.5
-        if r_blur < self.baseline_blur: 
-            real_risk = max(real_risk, (self.baseline_blur - r_blur) * 2)
+        if stat_risk is not None:
+            # Statistical drift on the image-quality features (KS + MMD)
+            real_risk = stat_risk
+        else:
+            # Warm-up fallback until the quality baseline exists
+            if r_bright < self.baseline_bright: 
+                real_risk = (self.baseline_bright - r_bright) * 1.5
+            if r_blur < self.baseline_blur: 
+                real_risk = max(real_risk, (self.baseline_blur - r_blur) * 2)
             
         target = max(sim_risk, real_risk)
         self.drift_score += (target - self.drift_score) * 0.2
@@ -68,12 +90,12 @@ class DriftSimulator:
             self.risk_budget -= 0.5 
             # Log Critical Events
             if previous_level != "CRITICAL" or len(self.logs) == 0 or (datetime.datetime.now().second % 5 == 0):
-                self.add_log("CRITICAL", "System Lockdown Initiated", "Visual Degradation / Sensor Blockage")
+                self.add_log("CRITICAL", "System Lockdown Initiated", stat_cause or "Visual Degradation / Sensor Blockage")
         elif self.drift_score > 30: 
             self.risk_level = "High"
             self.risk_budget -= 0.1
             if previous_level != "High":
-                self.add_log("WARNING", "Drift Threshold Exceeded", "Environmental Fog/Blur Detected")
+                self.add_log("WARNING", "Drift Threshold Exceeded", stat_cause or "Environmental Fog/Blur Detected")
         else: 
             self.risk_level = "LOW"
             self.risk_budget += 0.05 
@@ -105,56 +127,221 @@ class DriftSimulator:
         self.add_log("INFO", "System Re-Calibrated", "Manual Operator Override")
         print(f"✅ CALIBRATED")
 
+    # --- SHARED STATE ---
+    STATE_FIELDS = ("drift_score", "risk_budget", "risk_level", "persistence_counter",
+                    "baseline_bright", "baseline_blur", "baseline_quality", "logs")
+
+    def to_state(self):
+        return {name: getattr(self, name) for name in self.STATE_FIELDS}
+
+    def load_state(self, state):
+        for name in self.STATE_FIELDS:
+            setattr(self, name, state[name])
+
+# --- 3b. SHARED STATE ---
+# sim / quality_stream are per-process scratch objects. The real state lives in
+# the store, so every uvicorn worker sees the same risk budget, baseline and logs.
+# Set SENTINEL_STATE_DB to a local file path to share it between workers.
+STATE_DB = os.environ.get("SENTINEL_STATE_DB")
+
 sim = DriftSimulator()
-latest_blur = 100.0
-latest_bright = 150.0
-latest_quality = 1.0
+quality_stream = QualityDriftStream()
+pacer = FramePacer()  # Per-process: it measures this worker's own capacity
+frame_gates = {}      # camera_id -> FrameGate (per-process YOLO result cache, least recently used first)
+MAX_FRAME_GATES = 64            # Cameras whose last result is kept per worker
+FRAME_GATE_IDLE_SECONDS = 60.0  # A camera silent this long loses its cached result
+
+# Frames are scored in worker threads, one at a time per process: YOLO predictors
+# are not thread-safe, and sim / quality_stream are shared scratch objects.
+# Endpoints that write shared state hold the same lock.
+scoring_lock = threading.Lock()
+
+store = open_state_store(STATE_DB, {
+    "sim": sim.to_state(),
+    "quality": quality_stream.to_state(),
+    "quality_baseline": quality_stream.baseline_state(),  # Own entry: rewritten only on a new baseline
+    "latest": {"blur": 100.0, "bright": 150.0, "quality": 1.0},
+    "incident": None,  # Open drift incident: fingerprint + root cause; filed on calibration, dropped on recovery
+    "forecast": None,  # RiskForecaster state of the shared risk budget (O(1) per sample)
+})
+
+@contextmanager
+def shared_state():
+    """Loads shared state into sim / quality_stream, writes it back atomically."""
+    with store.transaction() as state:
+        sim.load_state(state["sim"])
+        quality_stream.load_state(state["quality"], state["quality_baseline"])
+        yield state
+        state["sim"] = sim.to_state()
+        state["quality"] = quality_stream.to_state()
+        state["quality_baseline"] = quality_stream.baseline_state()
+
+# Long-range history (per-frame samples + 1 s / 1 min / 1 h rollups on disk)
+TELEMETRY_DB = os.environ.get("SENTINEL_TELEMETRY_DB", os.path.join(current_dir, "..", "data", "telemetry.db"))
+os.makedirs(os.path.dirname(os.path.abspath(TELEMETRY_DB)), exist_ok=True)
+telemetry = TelemetryStore(TELEMETRY_DB)
+
+# Drift memory: past incidents searchable by packed fingerprint (Hamming distance)
+INCIDENT_DIR = os.environ.get("SENTINEL_INCIDENT_DIR", os.path.join(current_dir, "..", "data", "incidents"))
+fingerprint_layout = DriftEngine.fingerprint_layout(QUALITY_FEATURES)
+incident_index = FingerprintIndex(INCIDENT_DIR, len(fingerprint_layout), fingerprint_layout)
+
+def has_drift_bits(fingerprint):
+    """True if any test flagged drift (severity bits alone are just effect sizes)."""
+    bits = unpack_bits(fingerprint, len(fingerprint_layout))
+    return any(b for name, b in zip(fingerprint_layout, bits) if name.endswith(":drift"))
+
+def close_incident(state, resolution, root_cause=None):
+    """
+    Files the open incident (or the latest signature, if it shows drift) in the
+    index. Returns None when there is nothing to file. Call inside shared_state().
+    """
+    incident = state.get("incident")
+    fingerprint = incident["fingerprint"] if incident else quality_stream.last_fingerprint
+    if fingerprint is None:
+        return None
+    if incident is None and not has_drift_bits(fingerprint):
+        return None  # Nothing drifted: a routine calibration, not an incident
+    state["incident"] = None
+    return incident_index.add(
+        fingerprint,
+        root_cause or (incident["root_cause"] if incident else "Unspecified"),
+        resolution,
+        opened_at=incident["opened_at"] if incident else None)
+
+def frame_gate_for(camera_id):
+    """
+    The camera's gate, moved to the most recently used end. Gates of idle cameras,
+    and the oldest ones beyond MAX_FRAME_GATES, are dropped with their cached
+    frame. Call under scoring_lock.
+    """
+    gate = frame_gates.pop(camera_id, None) or FrameGate()
+    frame_gates[camera_id] = gate
+    now = time.monotonic()
+    for old_id in list(frame_gates)[:-1]:
+        old = frame_gates[old_id]
+        if len(frame_gates) <= MAX_FRAME_GATES and now - old.last_used < FRAME_GATE_IDLE_SECONDS:
+            break
+        del frame_gates[old_id]
+    return gate
+
+def load_shared_sim():
+    """Read-only view for the polling endpoints (no write lock, own copy)."""
+    view = DriftSimulator()
+    view.load_state(store.read()["sim"])
+    return view
 
 # --- 4. ENDPOINTS ---
 
-@app.post("/process-frame")
-async def process_frame(file: UploadFile = File(...), quality_flag: float = 1.0):
-    global latest_blur, latest_bright, latest_quality
-    try:
-        contents = await file.read()
+def score_frame(contents, quality_flag, seq, camera_id):
+    """Blocking part of /process-frame (runs in a worker thread). Returns (response, service_time)."""
+    with scoring_lock:
+        started_at = time.perf_counter()
         nparr = np.frombuffer(contents, np.uint8)
         frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
 
-        if frame is None: return {"status": "error"}
+        if frame is None: return {"status": "error"}, None
 
-        # A. YOLO
+        # A. YOLO (skipped while the scene is unchanged)
         frame_small = cv2.resize(frame, (320, 240))
+        gate = frame_gate_for(camera_id)
+        detections = gate.lookup(frame_small)
+        if detections is None and yolo_model:
+            detections = yolo_model(frame_small, verbose=False)[0]
+            gate.store(detections)
         yolo_base64 = ""
-        if yolo_model:
-            results = yolo_model(frame_small, verbose=False)
-            annotated_frame = results[0].plot()
-            _, buffer = cv2.imencode('.jpg', annotated_frame)
+        if detections is not None:
+            # Cached boxes go on the live frame, so the feed never freezes on a hit
+            _, buffer = cv2.imencode('.jpg', detections.plot(img=frame_small))
             yolo_base64 = base64.b64encode(buffer).decode('utf-8')
 
-        # B. Drift
-        gray = cv2.cvtColor(frame_small, cv2.COLOR_BGR2GRAY)
-        bright = np.mean(gray)
-        blur = cv2.Laplacian(frame_small, cv2.CV_64F).var()
-        
-        latest_blur = blur
-        latest_bright = bright
-        latest_quality = quality_flag
-        
-        sim.update(quality_flag, blur, bright)
+        # B. Drift (image-quality features -> statistical drift test)
+        features = extract_quality_features(frame_small)
+        bright = features["Brightness"]
+        blur = laplacian_variance(frame_small)  # Scale of the warm-up fallback thresholds
+
+        # Statistical test on a snapshot, outside the write lock (KS + MMD, and the
+        # engine rebuild after a new baseline); apply() drops it if the baseline moved
+        snapshot = store.read("quality", "quality_baseline")
+        quality_stream.load_state(snapshot["quality"], snapshot["quality_baseline"])
+        check = quality_stream.check(features)
+
+        with shared_state() as state:
+            state["latest"] = {"blur": blur, "bright": bright, "quality": quality_flag}
+
+            stat_risk = quality_stream.apply(features, check)
+            cause = quality_stream.top_cause()
+            stat_cause = f"Statistical Drift: {cause}" if cause else None
+            sim.update(quality_flag, blur, bright, stat_risk, stat_cause)
+
+            # Online forecast: the risk budget is shared by all cameras, so is its forecast
+            forecaster = RiskForecaster()
+            if state.get("forecast"): forecaster.load_state(state["forecast"])
+            forecaster.update(sim.risk_budget, sim.drift_score)
+            state["forecast"] = forecaster.to_state()
+
+            # Track the open incident
+            fingerprint = quality_stream.last_fingerprint
+            drifting = sim.risk_level != "LOW" and fingerprint is not None
+            if drifting:
+                incident = state.get("incident") or {
+                    "opened_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "root_cause": stat_cause or "Visual Degradation / Sensor Blockage"}
+                incident["fingerprint"] = fingerprint
+                state["incident"] = incident
+            elif sim.risk_level == "LOW" and state.get("incident"):
+                # Recovered on its own: the next episode opens a fresh incident
+                state["incident"] = None
+
+        # How similar past incidents were resolved (read-only, after the commit)
+        similar = incident_index.search(fingerprint, k=3) if drifting else []
+        telemetry.record(camera_id, drift=sim.drift_score, risk_budget=sim.risk_budget)
 
         return {
             "status": "processed",
             "current_drift": sim.drift_score,
             "risk": sim.risk_level,
             "risk_budget": sim.risk_budget,
-            "yolo_image": f"data:image/jpeg;base64,{yolo_base64}"
-        }
+            "quality_features": features,
+            "similar_incidents": similar,
+            "yolo_image": f"data:image/jpeg;base64,{yolo_base64}",
+            "seq": seq,
+        }, time.perf_counter() - started_at
+
+@app.post("/process-frame")
+async def process_frame(request: Request, file: UploadFile = File(...), quality_flag: float = 1.0,
+                        seq: int = None, camera_id: str = "default"):
+    # Backpressure: drop the frame instead of queueing it behind slow inference
+    sender = f"{request.client.host}/{camera_id}" if request.client else camera_id
+    reason = pacer.try_acquire(seq, camera_id, sender)
+    if reason:
+        return {"status": "dropped", "reason": reason, "pacing": pacer.advice()}
+
+    service_time = None
+    try:
+        contents = await file.read()
+        # Scoring blocks; in a thread the event loop keeps admitting (and counting) frames meanwhile
+        response, service_time = await run_in_threadpool(score_frame, contents, quality_flag, seq, camera_id)
+        response["pacing"] = pacer.advice()
+        return response
     except Exception as e:
         print(f"❌ Error: {e}")
-        return {"status": "error"}
+        return {"status": "error", "pacing": pacer.advice()}
+    finally:
+        pacer.release(service_time)
+
+@app.get("/pacing")
+async def get_pacing():
+    return pacer.stats()
+
+@app.get("/cache-stats")
+async def get_cache_stats():
+    # Motion-gate hit rate per camera (this worker)
+    return {camera_id: gate.stats() for camera_id, gate in list(frame_gates.items())}
 
 @app.get("/status")
 async def get_status():
+    sim = load_shared_sim()
     return {
         "risk_level": sim.risk_level,
         "global_drift_score": sim.drift_score,
@@ -162,20 +349,55 @@ async def get_status():
         "model_confidence": f"{max(45, int(98 - sim.drift_score/2))}% (Real-Time)"
     }
 
+@app.get("/telemetry")
+async def get_telemetry(stream: str = "default", start: float = None, end: float = None, max_points: int = 500):
+    # Range query for long charts; resolution is picked so the answer stays <= max_points
+    end = end or time.time()
+    start = start or end - 3600
+    return telemetry.query(stream, start, end, max(1, min(max_points, 5000)))
+
 @app.post("/calibrate")
-async def calibrate():
-    sim.calibrate(latest_blur, latest_bright, latest_quality)
+def calibrate():
+    with scoring_lock:
+        with shared_state() as state:
+            latest = state["latest"]
+            sim.calibrate(latest["blur"], latest["bright"], latest["quality"])
+            close_incident(state, "Re-baselined by supervisor (calibration)")
+            quality_stream.calibrate()
+            state["forecast"] = None  # New baseline, new regime
+        for gate in frame_gates.values(): gate.invalidate()
     return {"message": "Recalibrated"}
 
+@app.post("/incidents")
+def record_incident(root_cause: str, resolution: str):
+    # Supervisor annotates the current drift signature with what it was and how it was fixed
+    with scoring_lock, shared_state() as state:
+        incident = close_incident(state, resolution, root_cause)
+    if incident is None:
+        return {"message": "No open incident or drift signature to record"}
+    return {"message": "Incident recorded", "incident": incident}
+
+@app.get("/incidents/similar")
+async def similar_incidents(k: int = 5):
+    state = store.read()
+    incident = state.get("incident")
+    fingerprint = incident["fingerprint"] if incident else state["quality"].get("last_fingerprint")
+    if fingerprint is None:
+        return {"fingerprint": None, "matches": []}
+    return {
+        "fingerprint": dict(zip(fingerprint_layout, unpack_bits(fingerprint, len(fingerprint_layout)))),
+        "matches": incident_index.search(fingerprint, k=max(1, min(k, 50))),
+    }
+
 # --- FIX FOR LOGS & EXPLAINABILITY ---
 @app.get("/logs")
 async def get_logs():
-    # Return the actual list from memory
-    return {"logs": sim.logs}
+    # Return the shared list (same for every worker)
+    return {"logs": load_shared_sim().logs}
 
 @app.get("/explainability")
 async def get_ex():
-    score = sim.drift_score
+    score = load_shared_sim().drift_score
     
     # Dynamic Explanation based on score
     if score < 20:
@@ -197,7 +419,22 @@ async def get_ex():
     }
 
 @app.get("/forecast")
-async def get_forecast(): return {"persistence_counter": 0, "retraining_needed": False}
+async def get_forecast():
+    # Read-only: the state is updated per frame, this only projects it to "now"
+    forecaster = RiskForecaster()
+    saved = store.read("forecast").get("forecast")
+    if saved: forecaster.load_state(saved)
+    return forecaster.forecast()
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    # SENTINEL_WORKERS=4 python main.py -> 4 processes sharing one state file
+    workers = int(os.environ.get("SENTINEL_WORKERS", "1"))
+    if workers > 1:
+        if not STATE_DB:
+            state_db = os.path.join(tempfile.gettempdir(), "sentinel_state.db")
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(state_db + suffix): os.remove(state_db + suffix)
+            os.environ["SENTINEL_STATE_DB"] = state_db  # Inherited by the workers
+        uvicorn.run("main:app", host="127.0.0.1", port=8000, workers=workers)
+    else:
+        uvicorn.run(app, host="127.0.0.1", port=8000)
@@ -0,0 +1,222 @@
+import cv2
+import numpy as np
+import pandas as pd
+from collections import deque
+from drift_engine import DriftEngine
+
+# Order matters: this is the column order of the DataFrame fed to DriftEngine
+QUALITY_FEATURES = [
+    "Brightness",
+    "Contrast",
+    "Sharpness",
+    "Noise",
+    "Fog_Density",
+    "Saturation",
+    "Occluded_Fraction",
+]
+
+# Immerkaer fast noise estimator kernel (difference of two Laplacians)
+_NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+_MIN_FILTER = np.ones((7, 7), np.uint8)
+
+def extract_quality_features(frame, levels=1):
+    """
+    Image-quality feature vector from one downsampled pyramid level.
+    Works on uint8 / int16 / float32 only (no float64 copies of the frame)
+    so a 320x240 input at levels=1 stays well under a millisecond.
+    """
+    small = frame
+    for _ in range(levels):
+        small = cv2.pyrDown(small)
+
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    h, w = gray.shape
+
+    # 1. Brightness & Contrast
+    mean, std = cv2.meanStdDev(gray)
+
+    # 2. Sharpness (focus): variance of the Laplacian, int16 arithmetic
+    lap = cv2.Laplacian(gray, cv2.CV_16S)
+    _, lap_std = cv2.meanStdDev(lap)
+
+    # 3. Noise: Immerkaer's sigma estimate
+    residual = cv2.filter2D(gray, cv2.CV_32F, _NOISE_KERNEL)
+    noise = np.abs(residual[1:-1, 1:-1]).sum() * np.sqrt(np.pi / 2) / (6.0 * (w - 2) * (h - 2))
+
+    # 4. Fog: dark channel prior (haze lifts the per-patch minimum intensity)
+    b, g, r = cv2.split(small)
+    dark = cv2.erode(cv2.min(cv2.min(b, g), r), _MIN_FILTER)
+
+    # 5. Saturation (fog and lens dirt wash colours out)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+
+    # 6. Occlusion: dark AND textureless pixels (mud / tape / hand on lens)
+    texture = cv2.blur(cv2.convertScaleAbs(lap), (5, 5))
+    occluded = (gray < 40) & (texture < 4)
+
+    return {
+        "Brightness": float(mean[0, 0]),
+        "Contrast": float(std[0, 0]),
+        "Sharpness": float(lap_std[0, 0] ** 2),
+        "Noise": float(noise),
+        "Fog_Density": float(cv2.mean(dark)[0] / 255.0),
+        "Saturation": float(hsv[:, :, 1].mean() / 255.0),
+        "Occluded_Fraction": float(np.count_nonzero(occluded) / occluded.size),
+    }
+
+def laplacian_variance(frame):
+    """
+    Variance of the colour Laplacian at the input size: the scale DriftSimulator's
+    warm-up thresholds were tuned on. (Sharpness above is one pyramid level down
+    and grey, so its scale differs by a scene-dependent factor.)
+    int16 + meanStdDev gives the same value as the float64 version, ~5x faster.
+    """
+    lap = cv2.Laplacian(frame, cv2.CV_16S)
+    _, std = cv2.meanStdDev(lap.reshape(-1, 1))
+    return float(std[0, 0] ** 2)
+
+class QualityDriftStream:
+    """
+    Streams per-frame quality features into a DriftEngine.
+    The first `baseline_size` frames (at startup and again after every
+    calibration) become the reference; after that a sliding window is tested
+    every `check_every` frames (KS per feature + joint MMD).
+    All rows live in plain lists (see to_state / baseline_state) so several
+    worker processes can share them; each process only keeps its own
+    DriftEngine built from them.
+    With shared state, call check() on a snapshot outside the write lock and
+    apply() inside it; update() does both for single-process use.
+    """
+    def __init__(self, baseline_size=120, window_size=30, check_every=5):
+        self.baseline_size = baseline_size
+        self.window_size = window_size
+        self.check_every = check_every
+
+        self.engine = None
+        self.engine_version = 0  # baseline_version the local engine was built from
+        self.recent = deque(maxlen=baseline_size)  # Candidate baseline (only while warming up)
+        self.window = deque(maxlen=window_size)
+        self.frames_seen = 0
+
+        self.baseline = None
+        self.baseline_version = 0
+        self.last_score = None
+        self.last_cause = None
+        self.last_fingerprint = None  # Packed DriftEngine signature (list of uint64 words)
+
+    @property
+    def ready(self):
+        return self.baseline is not None
+
+    def update(self, features):
+        """Adds one feature dict. Returns the latest drift score (None while warming up)."""
+        return self.apply(features, self.check(features))
+
+    def check(self, features):
+        """
+        Runs the drift test if one is due once `features` is added, without
+        changing the stream. Slow part (KS + MMD, engine rebuild after a new
+        baseline); returns None when no test is due.
+        """
+        if self.baseline is None or (self.frames_seen + 1) % self.check_every != 0:
+            return None
+        rows = list(self.window)[1 - self.window_size:] + [[features[name] for name in QUALITY_FEATURES]]
+        if len(rows) < self.window_size:
+            return None
+
+        self._sync_engine()
+        report, score, _ = self.engine.check_data_drift(pd.DataFrame(rows, columns=QUALITY_FEATURES))
+        return {
+            "baseline_version": self.baseline_version,
+            "score": score,
+            "cause": self._top_cause(report),
+            "fingerprint": [int(w) for w in self.engine.get_packed_fingerprint(report)],
+        }
+
+    def apply(self, features, result=None):
+        """
+        Adds one frame and records a check() result. A result computed against
+        an older baseline (calibrated meanwhile) is dropped.
+        Returns the latest drift score (None while warming up).
+        """
+        row = [features[name] for name in QUALITY_FEATURES]
+        self.window.append(row)
+        self.frames_seen += 1
+
+        if self.baseline is None:
+            self.recent.append(row)
+            if len(self.recent) == self.baseline_size:
+                self._set_baseline()
+            return None
+
+        if result is not None and result["baseline_version"] == self.baseline_version:
+            self.last_score = result["score"]
+            self.last_cause = result["cause"]
+            self.last_fingerprint = result["fingerprint"]
+        return self.last_score
+
+    def top_cause(self):
+        """Name of the most drifted feature in the last check, or None."""
+        return self.last_cause
+
+    def calibrate(self):
+        """
+        Accepts the scene from now on as the new normal: the next `baseline_size`
+        frames become the reference. Frames from before the change are dropped.
+        """
+        self.baseline = None
+        self.recent.clear()
+        self.window.clear()
+        self.last_score = None
+        self.last_cause = None
+        self.last_fingerprint = None
+
+    # --- SHARED STATE ---
+    # Two entries: the small per-frame part, and the baseline, which only
+    # changes when a new reference is set.
+    def to_state(self):
+        return {
+            "recent": list(self.recent),
+            "window": list(self.window),
+            "frames_seen": self.frames_seen,
+            "last_score": self.last_score,
+            "last_cause": self.last_cause,
+            "last_fingerprint": self.last_fingerprint,
+        }
+
+    def baseline_state(self):
+        return {"version": self.baseline_version, "rows": self.baseline}
+
+    def load_state(self, state, baseline_state):
+        self.recent = deque(state["recent"], maxlen=self.baseline_size)
+        self.window = deque(state["window"], maxlen=self.window_size)
+        self.frames_seen = state["frames_seen"]
+        self.last_score = state["last_score"]
+        self.last_cause = state["last_cause"]
+        self.last_fingerprint = state.get("last_fingerprint")
+        self.baseline = baseline_state["rows"]
+        self.baseline_version = baseline_state["version"]
+
+    # --- INTERNALS ---
+    def _set_baseline(self):
+        self.baseline = [list(row) for row in self.recent]
+        self.baseline_version += 1
+        self.recent.clear()  # Not needed again until the next calibration
+
+    def _sync_engine(self):
+        """(Re)builds the local engine if another process moved the baseline."""
+        if self.engine is not None and self.engine_version == self.baseline_version:
+            return
+        baseline_df = pd.DataFrame(self.baseline, columns=QUALITY_FEATURES)
+        if self.engine is None:
+            self.engine = DriftEngine(baseline_df)
+            # The simulator already smooths the drift score; use instant scores here
+            self.engine.alpha = 1.0
+        else:
+            self.engine.update_baseline(baseline_df)
+        self.engine_version = self.baseline_version
+
+    @staticmethod
+    def _top_cause(report):
+        drifted = [(v["distance"], k) for k, v in report.items() if v.get("drift_detected")]
+        return max(drifted)[1] if drifted else None
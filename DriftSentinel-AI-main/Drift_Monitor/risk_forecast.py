@@ -0,0 +1,136 @@
+import time
+
+class RiskForecaster:
+    """
+    Streaming forecast of the risk budget, O(1) time and memory per sample.
+    Every camera feeds the same forecaster, so samples can arrive milliseconds
+    apart: they are folded onto a fixed `step` grid (latest values win) before
+    the models below see them.
+    - Holt's linear smoothing on the risk budget (level + trend per second)
+      -> time until the budget hits 0 (0 once it is spent).
+    - Two-sided CUSUM on the drift score -> regime and time since the last
+      regime change (reported only).
+    - Run length of drift above threshold -> retraining recommendation
+      (sustained drift only, however slowly it set in; a budget about to run
+      out is flagged separately).
+    State is a flat dict (to_state / load_state) so it can live in the shared store.
+    """
+    def __init__(self, alpha=0.3, beta=0.1, cusum_k=5.0, cusum_h=60.0, drift_threshold=30.0,
+                 sustain_seconds=120.0, exhaustion_horizon=600.0, baseline_alpha=0.05,
+                 exhausted_below=0.5, step=1.0):
+        self.alpha = alpha                      # Level smoothing
+        self.beta = beta                        # Trend smoothing
+        self.cusum_k = cusum_k                  # Slack: drift changes smaller than this are ignored
+        self.cusum_h = cusum_h                  # Alarm threshold for a regime change
+        self.drift_threshold = drift_threshold  # Same as DriftSimulator's "High" level
+        self.sustain_seconds = sustain_seconds
+        self.exhaustion_horizon = exhaustion_horizon
+        self.baseline_alpha = baseline_alpha    # How fast the CUSUM reference follows a stable regime
+        self.exhausted_below = exhausted_below  # Budget at or below this counts as spent
+        self.step = step                        # Seconds between model updates
+
+        self.level = None
+        self.trend = 0.0          # Budget units per second
+        self.last_budget = None   # Raw budget of the latest sample
+        self.last_ts = None       # Time of the last model update (on the step grid)
+        self.samples = 0
+
+        self.drift_ref = None     # Drift level of the current regime
+        self.cusum_up = 0.0
+        self.cusum_down = 0.0
+        self.regime = "stable"
+        self.regime_since = None
+
+        self.persistence_counter = 0  # Consecutive steps above drift_threshold
+        self.drift_since = None
+
+    # --- 1. UPDATE ---
+    def update(self, risk_budget, drift_score, ts=None):
+        ts = time.time() if ts is None else ts
+        self.last_budget = risk_budget
+        self.samples += 1
+        if self.level is None:
+            self.level, self.last_ts = risk_budget, ts
+            self.drift_ref, self.regime_since = drift_score, ts
+            self._update_persistence(drift_score, ts)
+            return
+        # Samples closer than one step only refresh last_budget; the next one
+        # past the step carries the latest values into the models
+        if ts - self.last_ts < self.step:
+            return
+
+        # Holt with irregular sampling: trend is per second, so scale by dt (>= step)
+        dt = ts - self.last_ts
+        prev_level = self.level
+        self.level = self.alpha * risk_budget + (1 - self.alpha) * (self.level + self.trend * dt)
+        self.trend = self.beta * (self.level - prev_level) / dt + (1 - self.beta) * self.trend
+        self.last_ts = ts
+
+        # CUSUM around the current regime's drift level
+        self.cusum_up = max(0.0, self.cusum_up + drift_score - self.drift_ref - self.cusum_k)
+        self.cusum_down = max(0.0, self.cusum_down + self.drift_ref - drift_score - self.cusum_k)
+        if self.cusum_up > self.cusum_h or self.cusum_down > self.cusum_h:
+            self.regime = "drifting" if self.cusum_up > self.cusum_h else "recovering"
+            self.regime_since = ts
+            self.drift_ref = drift_score
+            self.cusum_up = self.cusum_down = 0.0
+        else:
+            self.drift_ref += self.baseline_alpha * (drift_score - self.drift_ref)
+            if self.regime == "recovering" and drift_score < self.drift_threshold:
+                self.regime = "stable"
+
+        self._update_persistence(drift_score, ts)
+
+    def _update_persistence(self, drift_score, ts):
+        if drift_score > self.drift_threshold:
+            self.persistence_counter += 1
+            if self.drift_since is None: self.drift_since = ts
+        else:
+            self.persistence_counter = 0
+            self.drift_since = None
+
+    # --- 2. FORECAST ---
+    def forecast(self, now=None):
+        now = time.time() if now is None else now
+        if self.level is None:
+            return {"persistence_counter": 0, "retraining_needed": False, "samples": 0}
+
+        # Project the level to "now", then to zero along the trend.
+        # Holt only approaches 0 asymptotically, so a (near) empty budget counts as spent.
+        level_now = self.level + self.trend * (now - self.last_ts)
+        budget_now = self.last_budget if self.last_budget is not None else level_now
+        if min(level_now, budget_now) <= self.exhausted_below:
+            time_to_exhaustion = 0.0
+        elif self.trend < -1e-6:
+            time_to_exhaustion = level_now / -self.trend
+        else:
+            time_to_exhaustion = None  # Budget flat or refilling
+
+        sustained_for = now - self.drift_since if self.drift_since is not None else 0.0
+        retraining_needed = sustained_for >= self.sustain_seconds
+
+        return {
+            "persistence_counter": self.persistence_counter,
+            "retraining_needed": retraining_needed,
+            "exhaustion_imminent": time_to_exhaustion is not None and time_to_exhaustion < self.exhaustion_horizon,
+            "risk_budget_level": round(max(level_now, 0.0), 2),
+            "risk_budget_trend_per_min": round(self.trend * 60.0, 3),
+            "time_to_exhaustion_s": None if time_to_exhaustion is None else round(time_to_exhaustion, 1),
+            "regime": self.regime,
+            "time_since_regime_change_s": round(now - self.regime_since, 1),
+            "sustained_drift_s": round(sustained_for, 1),
+            "samples": self.samples,
+        }
+
+    # --- 3. SHARED STATE ---
+    STATE_FIELDS = ("level", "trend", "last_budget", "last_ts", "samples", "drift_ref", "cusum_up",
+                    "cusum_down", "regime", "regime_since", "persistence_counter", "drift_since")
+
+    def to_state(self):
+        return {name: getattr(self, name) for name in self.STATE_FIELDS}
+
+    def load_state(self, state):
+        # Fields missing from older saved state keep their defaults
+        for name in self.STATE_FIELDS:
+            setattr(self, name, state.get(name, getattr(self, name)))
+        return self
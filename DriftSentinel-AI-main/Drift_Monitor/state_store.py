@@ -0,0 +1,91 @@
+import copy
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Shared drift state for the API.
+# Both stores hold one JSON-serialisable dict and expose the same two calls:
+#   read(*keys)    -> snapshot copy (all top-level keys, or just the given ones)
+#   transaction()  -> context manager yielding a mutable copy; committed
+#                     atomically on normal exit, discarded on exception.
+# Top-level keys are only ever replaced or added, never deleted.
+
+class InMemoryStateStore:
+    """Single-process stand-in (default, and enough for tests)."""
+    def __init__(self, defaults):
+        self._state = copy.deepcopy(defaults)
+        self._lock = threading.Lock()
+
+    def read(self, *keys):
+        with self._lock:
+            return copy.deepcopy({k: self._state[k] for k in keys} if keys else self._state)
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            state = copy.deepcopy(self._state)
+            yield state
+            self._state = state
+
+class SQLiteStateStore:
+    """
+    Multi-process store backed by one SQLite file on the local host.
+    BEGIN IMMEDIATE takes the database write lock up front, so concurrent
+    read-modify-write cycles from different uvicorn workers serialise cleanly.
+    Each top-level key is its own row and only keys whose JSON changed are
+    written back, so large, rarely changing entries (e.g. a baseline) cost
+    nothing per frame.
+    """
+    def __init__(self, path, defaults, timeout=10.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")  # Readers never block the writer
+        conn.execute("CREATE TABLE IF NOT EXISTS state_kv (key TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        # First worker to start seeds the defaults; later workers keep what is there
+        conn.executemany("INSERT OR IGNORE INTO state_kv (key, data) VALUES (?, ?)",
+                         [(k, json.dumps(v)) for k, v in defaults.items()])
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _rows(self, conn, keys=()):
+        if keys:
+            marks = ", ".join("?" * len(keys))
+            return conn.execute(f"SELECT key, data FROM state_kv WHERE key IN ({marks})", keys).fetchall()
+        return conn.execute("SELECT key, data FROM state_kv").fetchall()
+
+    def read(self, *keys):
+        return {k: json.loads(data) for k, data in self._rows(self._conn(), keys)}
+
+    @contextmanager
+    def transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stored = dict(self._rows(conn))
+            state = {k: json.loads(data) for k, data in stored.items()}
+            yield state
+            changed = []
+            for k, v in state.items():
+                data = json.dumps(v)
+                if stored.get(k) != data: changed.append((k, data))
+            conn.executemany("INSERT OR REPLACE INTO state_kv (key, data) VALUES (?, ?)", changed)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+def open_state_store(path, defaults):
+    """SQLite store when a path is given (multi-worker), else in-memory."""
+    if path:
+        return SQLiteStateStore(path, defaults)
+    return InMemoryStateStore(defaults)
@@ -0,0 +1,44 @@
+import math
+
+import pytest
+
+from risk_forecast import RiskForecaster
+
+def budget_at(t):
+    return max(0.0, 100.0 - 0.5 * t)  # Drains at 30 per minute
+
+def feed_cameras(forecaster, cameras, spacing, seconds, fps=2.0):
+    """Every camera's frame within one tick arrives `spacing` seconds after the previous one."""
+    for tick in range(int(seconds * fps)):
+        for cam in range(cameras):
+            ts = tick / fps + cam * spacing
+            forecaster.update(budget_at(ts), 10.0, ts=ts)
+    return ts
+
+@pytest.mark.parametrize("cameras, spacing", [(8, 0.005), (3, 0.002), (3, 0.02), (8, 0.02), (1, 0.0)])
+def test_interleaved_cameras_keep_holt_stable(cameras, spacing):
+    f = RiskForecaster()
+    now = feed_cameras(f, cameras, spacing, seconds=60)
+    result = f.forecast(now=now)
+    assert math.isfinite(f.level) and math.isfinite(f.trend)
+    assert result["risk_budget_trend_per_min"] == pytest.approx(-30.0, rel=0.15)
+    assert result["risk_budget_level"] == pytest.approx(budget_at(now), abs=3.0)
+    assert result["time_to_exhaustion_s"] == pytest.approx((100.0 - 0.5 * now) / 0.5, rel=0.2)
+
+def test_slow_onset_recommends_retraining_and_spent_budget_is_exhausted():
+    # Drift ramps 0 -> 80 over 10 min at 2 fps, then holds for 20 min
+    f, budget = RiskForecaster(), 100.0
+    for i in range(30 * 60 * 2):
+        t = i * 0.5
+        drift = min(80.0, 80.0 * t / 600)
+        budget = max(0.0, budget - max(0.0, drift - 30.0) * 0.002)
+        f.update(budget, drift, ts=t)
+    result = f.forecast(now=t)
+    assert result["retraining_needed"]
+    assert result["exhaustion_imminent"] and result["time_to_exhaustion_s"] == 0.0
+
+def test_state_round_trip():
+    f = RiskForecaster()
+    feed_cameras(f, 2, 0.01, seconds=10)
+    restored = RiskForecaster().load_state(f.to_state())
+    assert restored.forecast(now=20.0) == f.forecast(now=20.0)
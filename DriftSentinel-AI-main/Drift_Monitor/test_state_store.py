@@ -0,0 +1,66 @@
+import multiprocessing
+
+import pytest
+
+from state_store import InMemoryStateStore, SQLiteStateStore
+
+DEFAULTS = {"quality": {"frames_seen": 0}, "quality_baseline": {"version": 0, "rows": []}}
+INCREMENTS = 200
+
+def make_store(kind, tmp_path):
+    if kind == "sqlite":
+        return SQLiteStateStore(str(tmp_path / "state.db"), DEFAULTS)
+    return InMemoryStateStore(DEFAULTS)
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_transaction_commits(kind, tmp_path):
+    store = make_store(kind, tmp_path)
+    with store.transaction() as state:
+        state["quality"]["frames_seen"] = 5
+    assert store.read("quality") == {"quality": {"frames_seen": 5}}
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_transaction_rolls_back_on_exception(kind, tmp_path):
+    store = make_store(kind, tmp_path)
+    with pytest.raises(RuntimeError):
+        with store.transaction() as state:
+            state["quality"]["frames_seen"] = 99
+            state["incident"] = {"opened_at": "now"}
+            raise RuntimeError("scoring failed")
+    assert store.read() == DEFAULTS
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_read_returns_a_copy(kind, tmp_path):
+    store = make_store(kind, tmp_path)
+    snapshot = store.read()
+    snapshot["quality"]["frames_seen"] = 42
+    assert store.read("quality")["quality"]["frames_seen"] == 0
+
+def test_sqlite_writes_only_changed_keys(tmp_path):
+    store = make_store("sqlite", tmp_path)
+    conn = store._conn()
+    before = conn.total_changes
+    with store.transaction() as state:
+        state["quality"]["frames_seen"] += 1  # quality_baseline is untouched
+    assert conn.total_changes - before == 1
+
+    before = conn.total_changes
+    with store.transaction():
+        pass
+    assert conn.total_changes == before
+
+def _increment(path, n):
+    store = SQLiteStateStore(path, DEFAULTS)
+    for _ in range(n):
+        with store.transaction() as state:
+            state["quality"]["frames_seen"] += 1
+
+def test_sqlite_read_modify_write_across_processes(tmp_path):
+    path = str(tmp_path / "state.db")
+    SQLiteStateStore(path, DEFAULTS)
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=_increment, args=(path, INCREMENTS)) for _ in range(3)]
+    for w in workers: w.start()
+    for w in workers: w.join(timeout=60)
+    assert all(w.exitcode == 0 for w in workers)
+    assert SQLiteStateStore(path, DEFAULTS).read("quality")["quality"]["frames_seen"] == 3 * INCREMENTS
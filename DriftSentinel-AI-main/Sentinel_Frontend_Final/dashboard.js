@@ -120,71 +120,115 @@ if (recalibrateBtn) {
     });
 }
 
-// --- 4. MAIN LOOP ---
-setInterval(async () => {
-    if (!video || video.readyState !== 4) return;
-
-    // A. Capture & Send
-    const canvas = document.createElement("canvas");
-    canvas.width = 320; canvas.height = 240;
-    canvas.getContext("2d").drawImage(video, 0, 0, 320, 240);
+// --- 4. MAIN LOOP (Paced by the server) ---
+// The server answers every frame with a "pacing" block. We never keep more
+// than maxInFlight frames outstanding, capture the frame at send time so it is
+// always the freshest one, and drop responses that arrive out of order.
+const pacing = {
+    maxInFlight: 1,
+    intervalMs: 500,
+    jpegQuality: 0.7,
+    inFlight: 0,
+    seq: 0,
+    lastRendered: -1
+};
+
+function applyPacing(advice) {
+    if (!advice) return;
+    pacing.maxInFlight = Math.max(1, advice.max_in_flight || 1);
+    pacing.intervalMs = Math.max(100, advice.recommended_interval_ms || 500);
+    pacing.jpegQuality = Math.min(0.9, Math.max(0.3, advice.jpeg_quality || 0.7));
+}
+
+function renderFrame(data) {
+    // B. Update YOLO (Left Screen)
+    if (data.yolo_image && yoloFeed) {
+        yoloFeed.src = data.yolo_image;
+        // Match Blur visual
+        const blur = (1 - currentQuality) * 5; 
+        yoloFeed.style.filter = `blur(${blur}px) grayscale(${(1-currentQuality)*80}%)`;
+    }
+
+    // C. Update Metrics (Right Screen)
+    if(scoreEl) scoreEl.innerText = data.current_drift.toFixed(1);
+    if(riskEl) {
+        riskEl.innerText = data.risk;
+        riskEl.style.color = data.risk === "CRITICAL" ? "#cf222e" : "#2da44e";
+    }
     
-    canvas.toBlob(async (blob) => {
+    // D. Update Fuel Bar
+    if(fuelFill) {
+        fuelFill.style.width = data.risk_budget + "%";
+        fuelFill.style.background = data.risk_budget < 30 ? "#cf222e" : "#2da44e";
+        if(fuelText) fuelText.innerText = Math.round(data.risk_budget) + "% Fuel";
+    }
+
+    // E. Update Chart
+    if (trendChart) {
+        const chartData = trendChart.data.datasets[0].data;
+        chartData.shift();
+        chartData.push(data.current_drift);
+        
+        // Color change based on risk
+        if(data.current_drift > 60) {
+            trendChart.data.datasets[0].borderColor = "#cf222e";
+            trendChart.data.datasets[0].backgroundColor = "rgba(207, 34, 46, 0.2)";
+        } else {
+            trendChart.data.datasets[0].borderColor = "#58a6ff";
+            trendChart.data.datasets[0].backgroundColor = "rgba(88, 166, 255, 0.1)";
+        }
+        trendChart.update();
+    }
+
+    // F. Lockdown Overlay
+    if(lockdownOverlay) {
+        if (data.risk === "CRITICAL") lockdownOverlay.classList.remove("hidden");
+        else lockdownOverlay.classList.add("hidden");
+    }
+}
+
+const captureCanvas = document.createElement("canvas");
+captureCanvas.width = 320; captureCanvas.height = 240;
+
+function sendFrame() {
+    // A. Capture & Send (capture happens now, so the frame is never stale)
+    captureCanvas.getContext("2d").drawImage(video, 0, 0, 320, 240);
+    // Sequence = capture time (ms), so it survives page reloads and is comparable across tabs
+    pacing.seq = Math.max(pacing.seq + 1, Date.now());
+    const seq = pacing.seq;
+    pacing.inFlight++;
+
+    captureCanvas.toBlob(async (blob) => {
         const formData = new FormData();
         formData.append("file", blob, "frame.jpg");
 
         try {
-            const res = await fetch(`${API}/process-frame?quality_flag=${currentQuality}`, { 
+            const res = await fetch(`${API}/process-frame?quality_flag=${currentQuality}&seq=${seq}`, { 
                 method: "POST", body: formData 
             });
             const data = await res.json();
+            applyPacing(data.pacing);
 
-            // B. Update YOLO (Left Screen)
-            if (data.yolo_image && yoloFeed) {
-                yoloFeed.src = data.yolo_image;
-                // Match Blur visual
-                const blur = (1 - currentQuality) * 5; 
-                yoloFeed.style.filter = `blur(${blur}px) grayscale(${(1-currentQuality)*80}%)`;
-            }
-
-            // C. Update Metrics (Right Screen)
-            if(scoreEl) scoreEl.innerText = data.current_drift.toFixed(1);
-            if(riskEl) {
-                riskEl.innerText = data.risk;
-                riskEl.style.color = data.risk === "CRITICAL" ? "#cf222e" : "#2da44e";
-            }
-            
-            // D. Update Fuel Bar
-            if(fuelFill) {
-                fuelFill.style.width = data.risk_budget + "%";
-                fuelFill.style.background = data.risk_budget < 30 ? "#cf222e" : "#2da44e";
-                if(fuelText) fuelText.innerText = Math.round(data.risk_budget) + "% Fuel";
-            }
-
-            // E. Update Chart
-            if (trendChart) {
-                const chartData = trendChart.data.datasets[0].data;
-                chartData.shift();
-                chartData.push(data.current_drift);
-                
-                // Color change based on risk
-                if(data.current_drift > 60) {
-                    trendChart.data.datasets[0].borderColor = "#cf222e";
-                    trendChart.data.datasets[0].backgroundColor = "rgba(207, 34, 46, 0.2)";
-                } else {
-                    trendChart.data.datasets[0].borderColor = "#58a6ff";
-                    trendChart.data.datasets[0].backgroundColor = "rgba(88, 166, 255, 0.1)";
-                }
-                trendChart.update();
-            }
-
-            // F. Lockdown Overlay
-            if(lockdownOverlay) {
-                if (data.risk === "CRITICAL") lockdownOverlay.classList.remove("hidden");
-                else lockdownOverlay.classList.add("hidden");
+            // Drop dropped/failed frames and anything older than what is on screen
+            if (data.status === "processed" && seq > pacing.lastRendered) {
+                pacing.lastRendered = seq;
+                renderFrame(data);
             }
+        } catch(e) {
+            console.error(e);
+            // Backend hiccup: back off instead of hammering it
+            pacing.intervalMs = Math.min(2000, pacing.intervalMs * 2);
+        } finally {
+            pacing.inFlight--;
+        }
+    }, "image/jpeg", pacing.jpegQuality);
+}
 
-        } catch(e) { console.error(e); }
-    }, "image/jpeg", 0.7);
+function pacingLoop() {
+    if (video && video.readyState === 4 && pacing.inFlight < pacing.maxInFlight) {
+        sendFrame();
+    }
+    setTimeout(pacingLoop, pacing.intervalMs);
+}
 
-}, 500);
+pacingLoop();
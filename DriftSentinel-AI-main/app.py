@@ -1,13 +1,15 @@
 import streamlit as st
 import cv2
 import numpy as np
-import time
 from ultralytics import YOLO
 from sentinel_core import DriftMonitor
-import tempfile
+from frame_gate import FrameGate
+from telemetry_store import TelemetryStore
+from upload_spool import UploadSpool
 import os
 from datetime import datetime
 from collections import deque
+from contextlib import ExitStack
 import pandas as pd
 import altair as alt
 
@@ -68,6 +70,22 @@ def load_models():
     monitor = DriftMonitor("models/sentinel_model.pth")
     return yolo, monitor
 
+@st.cache_resource
+def load_telemetry():
+    os.makedirs("data", exist_ok=True)
+    return TelemetryStore(os.path.join("data", "telemetry.db"))
+
+@st.cache_resource
+def load_spool():
+    # Shared by all sessions, so one upload can be replayed from any of them
+    quota_gb = float(os.environ.get("SENTINEL_UPLOAD_QUOTA_GB", "20"))
+    return UploadSpool(os.path.join("data", "uploads"), int(quota_gb * 1e9))
+
+# Shift-length recordings are copied here on the server and imported from disk:
+# the browser uploader holds the whole file in memory, this path never does
+IMPORT_DIR = os.environ.get("SENTINEL_IMPORT_DIR", os.path.join("data", "imports"))
+VIDEO_EXTS = (".mp4", ".avi")
+
 try:
     yolo_model, drift_monitor = load_models()
 except Exception as e:
@@ -75,13 +93,47 @@ except Exception as e:
     st.stop()
 
 # --- 6. UPLOADER ---
-temp_file_path = None
+recording = None
 if input_source == "Upload Video":
+    spool = load_spool()
     uploaded_file = st.sidebar.file_uploader("Upload CCTV Footage", type=["mp4", "avi"])
     if uploaded_file:
-        tfile = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
-        tfile.write(uploaded_file.read())
-        temp_file_path = tfile.name
+        # Every widget click reruns the script: spool each upload only once
+        if st.session_state.get('upload_file_id') != uploaded_file.file_id:
+            try:
+                with st.spinner("Saving footage..."):
+                    entry = spool.ingest(uploaded_file, uploaded_file.name, uploaded_file.size)
+            except ValueError as e:
+                st.sidebar.error(str(e))
+                st.stop()
+            st.session_state['upload_file_id'] = uploaded_file.file_id
+            st.session_state['upload_recording_id'] = entry["id"]
+        recording = spool.get(st.session_state['upload_recording_id'])
+    else:
+        os.makedirs(IMPORT_DIR, exist_ok=True)
+        importable = sorted(f for f in os.listdir(IMPORT_DIR) if f.lower().endswith(VIDEO_EXTS))
+        if importable:
+            to_import = st.sidebar.selectbox(f"Import from {IMPORT_DIR}", [None] + importable,
+                                             format_func=lambda f: "—" if f is None else f)
+            if to_import and st.sidebar.button("📥 Import Recording"):
+                path = os.path.join(IMPORT_DIR, to_import)
+                try:
+                    # Streamed into the spool in 1 MB chunks
+                    with st.spinner("Importing footage..."), open(path, "rb") as f:
+                        entry = spool.ingest(f, to_import, os.path.getsize(path))
+                except (OSError, ValueError) as e:
+                    st.sidebar.error(str(e))
+                    st.stop()
+                st.session_state['import_recording_id'] = entry["id"]
+
+        # Recordings already on disk (this or earlier sessions) need no re-upload
+        recent = spool.recordings()
+        if recent:
+            by_id = {e["id"]: e for e in recent}
+            choice = st.sidebar.selectbox("Recent recordings", [None] + list(by_id),
+                                          format_func=lambda i: "—" if i is None else
+                                          f"{by_id[i]['name']} ({by_id[i]['size'] / 1e6:.0f} MB)")
+            recording = by_id.get(choice or st.session_state.get('import_recording_id'))
 
 # --- 7. MAIN LAYOUT ---
 st.markdown("## 🏭 Industrial AI Reliability Monitor")
@@ -96,107 +148,116 @@ with col_video: video_placeholder = st.empty()
 with col_graph: 
     st.write("**Real-time Drift Signature**")
     chart_placeholder = st.empty() 
+    cache_placeholder = st.empty()
 
 # --- 8. RUN LOGIC ---
 run_system = st.toggle("🚀 Activate Sentinel System", value=False)
 
 if run_system:
+    resources = ExitStack()  # Released even when Streamlit interrupts the loop (toggle off / rerun)
     if input_source == "Webcam": cap = cv2.VideoCapture(0)
-    elif temp_file_path: cap = cv2.VideoCapture(temp_file_path)
+    elif recording: cap = cv2.VideoCapture(resources.enter_context(spool.lease(recording["id"])))
     else: st.warning("Waiting for video source..."); st.stop()
+    resources.callback(cap.release)
 
     smoothing_buffer = deque(maxlen=30) 
     graph_data = deque(maxlen=50) 
+    frame_gate = FrameGate()
+    telemetry = load_telemetry()
+    stream_name = "app:webcam" if input_source == "Webcam" else f"app:{recording['name']}"
 
-    while cap.isOpened() and run_system:
-        ret, frame = cap.read()
-        if not ret: break
-
-        # A. CORE LOGIC
-        raw_loss = drift_monitor.get_drift_score(frame)
-
-        # B. CALIBRATION HANDLING
-        if st.session_state.get('force_recalibrate', False):
-            st.session_state['baseline_loss'] = raw_loss
-            st.session_state['force_recalibrate'] = False 
-            st.session_state['is_calibrated'] = True
-            smoothing_buffer.clear()
-            add_log(f"Baseline calibrated to {raw_loss:.2f}", "SUCCESS")
-            st.toast("System Calibrated", icon="🎯")
-
-        instant_drift = max(0.0, raw_loss - st.session_state['baseline_loss'])
-        smoothing_buffer.append(instant_drift)
-        smoothed_drift = sum(smoothing_buffer) / len(smoothing_buffer) if smoothing_buffer else instant_drift
-
-        # C. FUNCTIONAL CHECK (YOLO)
-        results = yolo_model(frame, verbose=False)
-        annotated_frame = results[0].plot()
-        
-        worker_count = 0
-        for box in results[0].boxes:
-            if int(box.cls[0]) == 0: 
-                worker_count += 1
-        
-        penalty = 0.0
-        if strict_mode and st.session_state['is_calibrated'] and worker_count == 0:
-            penalty = 10.0 
+    try:
+        while cap.isOpened() and run_system:
+            ret, frame = cap.read()
+            if not ret: break
+
+            # A. CORE LOGIC (models only run when the scene actually changed)
+            recalibrating = st.session_state.get('force_recalibrate', False)
+            if recalibrating: frame_gate.invalidate()
 
-        final_score = smoothed_drift + penalty
-        graph_data.append(final_score)
+            cached = frame_gate.lookup(frame)
+            if cached is not None:
+                raw_loss, worker_count, detections = cached
+            else:
+                raw_loss = drift_monitor.get_drift_score(frame)
 
-        # D. DECISION
-        is_alarm = final_score > drift_threshold
+                # A2. FUNCTIONAL CHECK (YOLO)
+                results = yolo_model(frame, verbose=False)
+                detections = results[0]
+            
+                worker_count = 0
+                for box in results[0].boxes:
+                    if int(box.cls[0]) == 0: 
+                        worker_count += 1
+                frame_gate.store((raw_loss, worker_count, detections))
+            # Boxes are drawn on the live frame, so a cache hit never freezes the video
+            annotated_frame = detections.plot(img=frame)
+
+            # B. CALIBRATION HANDLING
+            if recalibrating:
+                st.session_state['baseline_loss'] = raw_loss
+                st.session_state['force_recalibrate'] = False 
+                st.session_state['is_calibrated'] = True
+                smoothing_buffer.clear()
+                add_log(f"Baseline calibrated to {raw_loss:.2f}", "SUCCESS")
+                st.toast("System Calibrated", icon="🎯")
+
+            instant_drift = max(0.0, raw_loss - st.session_state['baseline_loss'])
+            smoothing_buffer.append(instant_drift)
+            smoothed_drift = sum(smoothing_buffer) / len(smoothing_buffer) if smoothing_buffer else instant_drift
+
+            penalty = 0.0
+            if strict_mode and st.session_state['is_calibrated'] and worker_count == 0:
+                penalty = 10.0 
+
+            final_score = smoothed_drift + penalty
+            graph_data.append(final_score)
+            telemetry.record(stream_name, drift=final_score, workers=worker_count)
 
-        if is_alarm:
-            status_metric.metric("System Status", "CRITICAL", delta="FAILURE DETECTED", delta_color="inverse")
-            score_metric.metric("Drift Score", f"{final_score:.2f}", delta=f"+{final_score-drift_threshold:.1f} High", delta_color="inverse")
-            action_metric.metric("Auto-Response", "RE-ROUTING", "Triggering Backup")
+            # D. DECISION
+            is_alarm = final_score > drift_threshold
+
+            if is_alarm:
+                status_metric.metric("System Status", "CRITICAL", delta="FAILURE DETECTED", delta_color="inverse")
+                score_metric.metric("Drift Score", f"{final_score:.2f}", delta=f"+{final_score-drift_threshold:.1f} High", delta_color="inverse")
+                action_metric.metric("Auto-Response", "RE-ROUTING", "Triggering Backup")
             
-            cv2.rectangle(annotated_frame, (0,0), (annotated_frame.shape[1], annotated_frame.shape[0]), (0,0,255), 30)
-            cv2.putText(annotated_frame, "DATA CORRUPTED", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0,0,255), 4)
+                cv2.rectangle(annotated_frame, (0,0), (annotated_frame.shape[1], annotated_frame.shape[0]), (0,0,255), 30)
+                cv2.putText(annotated_frame, "DATA CORRUPTED", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0,0,255), 4)
              
-            if not st.session_state['logs'] or "CRITICAL" not in st.session_state['logs'][0]:
-                add_log(f"Drift Spike: {final_score:.2f}", "ALERT")
-        else:
-            status_metric.metric("System Status", "NOMINAL", delta="Optimal")
-            score_metric.metric("Drift Score", f"{final_score:.2f}", delta="Stable", delta_color="normal")
-            action_metric.metric("Auto-Response", "IDLE", "Monitoring...")
+                if not st.session_state['logs'] or "CRITICAL" not in st.session_state['logs'][0]:
+                    add_log(f"Drift Spike: {final_score:.2f}", "ALERT")
+            else:
+                status_metric.metric("System Status", "NOMINAL", delta="Optimal")
+                score_metric.metric("Drift Score", f"{final_score:.2f}", delta="Stable", delta_color="normal")
+                action_metric.metric("Auto-Response", "IDLE", "Monitoring...")
 
-        obj_metric.metric("Workers Detected", f"{worker_count}")
+            obj_metric.metric("Workers Detected", f"{worker_count}")
 
-        # E. RENDER VIDEO
-        frame_rgb = cv2.cvtColor(annotated_frame, cv2.COLOR_BGR2RGB)
-        video_placeholder.image(frame_rgb, channels="RGB", use_container_width=True)
+            # E. RENDER VIDEO
+            frame_rgb = cv2.cvtColor(annotated_frame, cv2.COLOR_BGR2RGB)
+            video_placeholder.image(frame_rgb, channels="RGB", use_container_width=True)
 
-        # F. RENDER CHART
-        df = pd.DataFrame({"Frame": range(len(graph_data)), "Drift Score": list(graph_data)})
+            # F. RENDER CHART
+            df = pd.DataFrame({"Frame": range(len(graph_data)), "Drift Score": list(graph_data)})
         
-        base = alt.Chart(df).encode(
-            x=alt.X('Frame', axis=None),
-            y=alt.Y('Drift Score', scale=alt.Scale(domain=[0, 15])) 
-        )
-        area = base.mark_area(
-            color=alt.Gradient(
-                gradient='linear',
-                stops=[alt.GradientStop(color='#00FFAA', offset=0),
-                       alt.GradientStop(color='rgba(0, 255, 170, 0.1)', offset=1)],
-                x1=1, x2=1, y1=1, y2=0
-            ), opacity=0.5
-        )
-        line = base.mark_line(color='#00FFAA', strokeWidth=3)
-        chart_placeholder.altair_chart((area + line).properties(height=200), use_container_width=True)
-
-    # --- THE SILENCER (Final Fix for PermissionError) ---
-    cap.release()
-    
-    # Wait for Windows to release file handle
-    time.sleep(0.2)
-    
-    if temp_file_path:
-        try:
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
-        except PermissionError:
-            pass # IGNORE the error if Windows locks the file
-        except Exception:
-            pass # IGNORE any other cleanup errors
\ No newline at end of file
+            base = alt.Chart(df).encode(
+                x=alt.X('Frame', axis=None),
+                y=alt.Y('Drift Score', scale=alt.Scale(domain=[0, 15])) 
+            )
+            area = base.mark_area(
+                color=alt.Gradient(
+                    gradient='linear',
+                    stops=[alt.GradientStop(color='#00FFAA', offset=0),
+                           alt.GradientStop(color='rgba(0, 255, 170, 0.1)', offset=1)],
+                    x1=1, x2=1, y1=1, y2=0
+                ), opacity=0.5
+            )
+            line = base.mark_line(color='#00FFAA', strokeWidth=3)
+            chart_placeholder.altair_chart((area + line).properties(height=200), use_container_width=True)
+
+            gate_stats = frame_gate.stats()
+            cache_placeholder.caption(f"Model cache hit rate: {gate_stats['hit_rate']*100:.0f}% "
+                                      f"({gate_stats['hits']} reused / {gate_stats['misses']} scored)")
+    finally:
+        resources.close()
\ No newline at end of file
@@ -0,0 +1,79 @@
+import time
+import cv2
+import numpy as np
+
+# --- Motion Gate (Frame Deduplication Cache) ---
+# Static CCTV produces long runs of near-identical frames. Instead of running
+# the VAE and YOLO on every one, compare a tiny grayscale thumbnail against the
+# last frame that was actually scored and reuse its results while the scene
+# has not changed. Staleness is bounded by frame count and wall-clock age.
+# The thumbnail alone is blind to blur (it averages detail away), so the
+# signature also carries the Laplacian energy of a larger thumbnail: losing
+# sharpness is exactly what the VAE score has to see.
+class FrameGate:
+    def __init__(self, threshold=2.0, max_stale_frames=30, max_stale_seconds=2.0, size=(32, 24),
+                 detail_size=(128, 96), detail_tolerance=0.15, detail_floor=50.0):
+        self.threshold = threshold                  # Mean abs diff (0-255 scale) that counts as "changed"
+        self.max_stale_frames = max_stale_frames    # Force a refresh after this many reuses...
+        self.max_stale_seconds = max_stale_seconds  # ...or after this much time
+        self.size = size
+        self.detail_size = detail_size
+        self.detail_tolerance = detail_tolerance    # Relative change in Laplacian energy that counts as "changed"
+        self.detail_floor = detail_floor            # Energy floor, so flat scenes do not flap on noise
+
+        self._signature = None   # (thumbnail, detail energy) of the last scored frame
+        self._pending = None     # Signature of the frame currently being looked up
+        self._result = None
+        self._stored_at = 0.0
+        self._reuses = 0
+        self.last_used = time.monotonic()  # Last lookup, for evicting idle cameras
+
+        self.hits = 0
+        self.misses = 0
+
+    def _signature_of(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        detail = cv2.resize(gray, self.detail_size, interpolation=cv2.INTER_AREA)
+        _, lap_std = cv2.meanStdDev(cv2.Laplacian(detail, cv2.CV_16S))
+        return cv2.resize(detail, self.size, interpolation=cv2.INTER_AREA), float(lap_std[0, 0] ** 2)
+
+    def lookup(self, frame):
+        """
+        Returns the cached result if the scene is effectively unchanged,
+        otherwise None (caller runs the models and calls store()).
+        """
+        self._pending = self._signature_of(frame)
+        self.last_used = time.monotonic()
+
+        if self._result is not None \
+                and self._reuses < self.max_stale_frames \
+                and time.monotonic() - self._stored_at < self.max_stale_seconds:
+            (thumb, energy), (ref_thumb, ref_energy) = self._pending, self._signature
+            change = float(np.mean(cv2.absdiff(thumb, ref_thumb)))
+            detail_change = abs(energy - ref_energy) / max(ref_energy, self.detail_floor)
+            if change < self.threshold and detail_change < self.detail_tolerance:
+                self._reuses += 1
+                self.hits += 1
+                return self._result
+
+        self.misses += 1
+        return None
+
+    def store(self, result):
+        """Caches the result for the frame passed to the last lookup()."""
+        self._signature = self._pending
+        self._result = result
+        self._stored_at = time.monotonic()
+        self._reuses = 0
+
+    def invalidate(self):
+        """Forces the next frame to be scored (e.g. after calibration)."""
+        self._result = None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,334 @@
+import argparse
+import datetime
+import http.client
+import json
+import os
+import subprocess
+import threading
+import time
+import uuid
+from urllib.parse import urlparse
+
+import cv2
+import numpy as np
+
+# CONFIGURATION (defaults, all overridable from the command line)
+API_URL = "http://127.0.0.1:8000"
+CAMERAS = 4            # Concurrent virtual cameras
+FPS = 2.0              # Frames per second per camera (dashboard.js sends ~2)
+DURATION = 30          # Seconds of measured load
+WARMUP = 5             # Seconds of load before measuring starts
+JPEG_QUALITY = 70      # Same as dashboard.js (0.7)
+FRAME_SIZE = (320, 240)
+
+# Polling done by the other frontend pages (endpoint, interval in seconds)
+FRONTEND_POLLERS = [
+    ("/status", 2.0),          # drift.js
+    ("/status", 1.0),          # supervisor.js
+    ("/explainability", 2.0),  # explainability.js
+    ("/logs", 3.0),            # blackbox.js
+]
+
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+# --- 1. FRAME SOURCES ---
+def load_video_frames(path, max_frames, quality):
+    """Decodes a local video once and keeps the JPEG bytes for replay."""
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while cap.isOpened() and len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret: break
+        frame = cv2.resize(frame, FRAME_SIZE)
+        frames.append(cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes())
+    cap.release()
+    if not frames:
+        raise SystemExit(f"❌ Could not read any frames from {path}")
+    return frames
+
+def make_synthetic_frames(n, quality, seed):
+    """A moving 'worker' on a noisy site background, so motion/noise look real."""
+    rng = np.random.default_rng(seed)
+    w, h = FRAME_SIZE
+    background = rng.integers(60, 180, (h, w, 3), dtype=np.uint8)
+    background = cv2.GaussianBlur(background, (15, 15), 0)
+    frames = []
+    for i in range(n):
+        frame = background.copy()
+        x = int((i * 7) % (w - 40))
+        cv2.rectangle(frame, (x, 80), (x + 40, 200), (0, 140, 255), -1)
+        noise = rng.integers(0, 12, frame.shape, dtype=np.uint8)
+        frame = cv2.add(frame, noise)
+        frames.append(cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes())
+    return frames
+
+# --- 2. STATS ---
+def latency_summary(latencies):
+    lat = np.array(latencies) * 1000.0
+    pct = lambda q: round(float(np.percentile(lat, q)), 1) if len(lat) else None
+    return {
+        "mean": round(float(lat.mean()), 1) if len(lat) else None,
+        "p50": pct(50), "p90": pct(90), "p95": pct(95), "p99": pct(99),
+        "max": round(float(lat.max()), 1) if len(lat) else None,
+    }
+
+class EndpointStats:
+    """
+    Outcomes: "ok" (served), "rejected" (answered instantly with a backpressure
+    drop) or "error". Rejections get their own latency series so they never
+    make the served latency look better under overload.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.rejected_latencies = []
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, latency, outcome):
+        with self.lock:
+            self.requests += 1
+            if outcome == "ok": self.latencies.append(latency)
+            elif outcome == "rejected": self.rejected_latencies.append(latency)
+            else: self.errors += 1
+
+    def summary(self, duration):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.requests, 4) if self.requests else 0.0,
+            "rejected": len(self.rejected_latencies),
+            "throughput_rps": round(self.requests / duration, 2),
+            "latency_ms": latency_summary(self.latencies),
+            "rejected_latency_ms": latency_summary(self.rejected_latencies),
+        }
+
+class FrameStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.scheduled = 0       # Frame slots the camera produced
+        self.skipped = 0         # Slots missed because the previous request was still running
+        self.server_dropped = 0  # Server answered "dropped" (backpressure)
+        self.processed = 0
+
+    def add(self, **counts):
+        with self.lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def summary(self, duration):
+        dropped = self.skipped + self.server_dropped
+        return {
+            "scheduled": self.scheduled,
+            "processed": self.processed,
+            "skipped_client": self.skipped,
+            "dropped_server": self.server_dropped,
+            "drop_rate": round(dropped / self.scheduled, 4) if self.scheduled else 0.0,
+            "useful_fps": round(self.processed / duration, 2),
+        }
+
+# --- 3. HTTP ---
+class Client:
+    """One keep-alive connection per thread (http.client is not thread-safe)."""
+    def __init__(self, host, port, timeout):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self.conn.request(method, path, body=body, headers=headers or {})
+            resp = self.conn.getresponse()
+            data = resp.read()
+            return resp.status, data
+        except Exception:
+            self.conn.close()
+            self.conn = None
+            raise
+
+def multipart(jpeg_bytes):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="frame.jpg"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + jpeg_bytes + f"\r\n--{boundary}--\r\n".encode()
+    return body, {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+# --- 4. WORKERS ---
+def camera_worker(cam_id, frames, args, client, stats, frame_stats, measuring, stop):
+    """Sends at a fixed rate; one request in flight, late slots are skipped (freshest frame wins)."""
+    interval = 1.0 / args.fps
+    next_tick = time.perf_counter() + (cam_id * interval / max(args.cameras, 1))  # Stagger cameras
+    index = 0
+    while not stop.is_set():
+        now = time.perf_counter()
+        if now < next_tick:
+            time.sleep(next_tick - now)
+            continue
+
+        # Slots that passed while the previous request was running are lost
+        missed = int((now - next_tick) // interval)
+        next_tick += (missed + 1) * interval
+        index = (index + missed + 1) % len(frames)
+
+        body, headers = multipart(frames[index])
+        seq = int(time.time() * 1000)
+        started = time.perf_counter()
+        status = None
+        try:
+            code, data = client.request("POST", f"/process-frame?quality_flag=1.0&seq={seq}&camera_id=cam{cam_id}", body, headers)
+            status = json.loads(data).get("status") if code == 200 else None
+        except Exception:
+            pass
+        latency = time.perf_counter() - started
+        outcome = {"processed": "ok", "dropped": "rejected"}.get(status, "error")
+
+        if measuring.is_set():
+            stats.record(latency, outcome)
+            frame_stats.add(scheduled=missed + 1, skipped=missed,
+                            server_dropped=int(status == "dropped"),
+                            processed=int(status == "processed"))
+
+def poll_worker(path, period, client, stats, measuring, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            code, _ = client.request("GET", path)
+            if code == 200: outcome = "ok"
+        except Exception:
+            pass
+        if measuring.is_set():
+            stats.record(time.perf_counter() - started, outcome)
+        stop.wait(max(0.0, period - (time.perf_counter() - started)))
+
+# --- 5. REPORT ---
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "unknown"
+
+def print_report(report):
+    print(f"\n📊 LOAD TEST ({report['meta']['cameras']} cams @ {report['meta']['fps']} fps, "
+          f"{report['meta']['duration_s']} s, build {report['meta']['git_revision']})")
+    print(f"{'endpoint':<18}{'req':>7}{'rps':>8}{'err%':>7}{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8}")
+    for name, ep in report["endpoints"].items():
+        lat = ep["latency_ms"]
+        print(f"{name:<18}{ep['requests']:>7}{ep['throughput_rps']:>8}{ep['error_rate']*100:>7.1f}"
+              f"{str(lat['p50']):>8}{str(lat['p90']):>8}{str(lat['p99']):>8}{str(lat['max']):>8}")
+        if ep["rejected"]:
+            rej = ep["rejected_latency_ms"]
+            print(f"{'  (rejected)':<18}{ep['rejected']:>7}{'':>15}"
+                  f"{str(rej['p50']):>8}{str(rej['p90']):>8}{str(rej['p99']):>8}{str(rej['max']):>8}")
+    fr = report["frames"]
+    print(f"frames: {fr['processed']}/{fr['scheduled']} processed, useful {fr['useful_fps']} fps, "
+          f"drop rate {fr['drop_rate']*100:.1f}% (client {fr['skipped_client']}, server {fr['dropped_server']})")
+
+def print_comparison(old, new):
+    """Prints p50/p99/throughput deltas against a previous report."""
+    print(f"\n🔁 COMPARED WITH build {old['meta']['git_revision']} ({old['meta']['started_at']})")
+    for name, ep in new["endpoints"].items():
+        prev = old["endpoints"].get(name)
+        if not prev: continue
+        parts = []
+        for label, a, b in [("rps", prev["throughput_rps"], ep["throughput_rps"]),
+                            ("p50", prev["latency_ms"]["p50"], ep["latency_ms"]["p50"]),
+                            ("p99", prev["latency_ms"]["p99"], ep["latency_ms"]["p99"])]:
+            if a is None or b is None: continue
+            change = f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+            parts.append(f"{label} {a} -> {b} ({change})")
+        print(f"  {name:<18}" + ", ".join(parts))
+    a, b = old["frames"]["useful_fps"], new["frames"]["useful_fps"]
+    print(f"  {'useful fps':<18}{a} -> {b}")
+
+# --- 6. MAIN ---
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replays video/synthetic frames against the local Sentinel API.")
+    parser.add_argument("--url", default=API_URL)
+    parser.add_argument("--cameras", type=int, default=CAMERAS)
+    parser.add_argument("--fps", type=float, default=FPS)
+    parser.add_argument("--duration", type=float, default=DURATION)
+    parser.add_argument("--warmup", type=float, default=WARMUP)
+    parser.add_argument("--video", action="append", default=[], help="Local video file (repeat for more; cycled over cameras)")
+    parser.add_argument("--max-frames", type=int, default=300, help="Frames decoded per video")
+    parser.add_argument("--jpeg-quality", type=int, default=JPEG_QUALITY)
+    parser.add_argument("--no-pollers", action="store_true", help="Skip the /status, /logs, /explainability polling")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", default=None, help="Report path (default: load_report_<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="Previous report to diff against")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    url = urlparse(args.url)
+    if url.hostname not in LOCAL_HOSTS:
+        raise SystemExit(f"❌ Refusing to load-test non-local host '{url.hostname}'. Use 127.0.0.1.")
+    host, port = url.hostname, url.port or 80
+
+    # Pre-encode everything so the generator itself is never the bottleneck
+    sources = [load_video_frames(v, args.max_frames, args.jpeg_quality) for v in args.video]
+    camera_frames = [sources[i % len(sources)] if sources else make_synthetic_frames(60, args.jpeg_quality, seed=i)
+                     for i in range(args.cameras)]
+
+    stats = {"/process-frame": EndpointStats()}
+    frame_stats = FrameStats()
+    measuring, stop = threading.Event(), threading.Event()
+    threads = []
+
+    for cam_id, frames in enumerate(camera_frames):
+        client = Client(host, port, args.timeout)
+        threads.append(threading.Thread(target=camera_worker, daemon=True,
+            args=(cam_id, frames, args, client, stats["/process-frame"], frame_stats, measuring, stop)))
+
+    if not args.no_pollers:
+        for path, period in FRONTEND_POLLERS:
+            ep = stats.setdefault(path, EndpointStats())
+            threads.append(threading.Thread(target=poll_worker, daemon=True,
+                args=(path, period, Client(host, port, args.timeout), ep, measuring, stop)))
+
+    print(f"🚀 {args.cameras} cameras @ {args.fps} fps -> {args.url} "
+          f"({'video' if sources else 'synthetic'} frames), warmup {args.warmup}s, measuring {args.duration}s")
+    started_at = datetime.datetime.now().isoformat(timespec="seconds")
+    for t in threads: t.start()
+
+    time.sleep(args.warmup)
+    measuring.set()
+    measure_start = time.perf_counter()
+    time.sleep(args.duration)
+    measuring.clear()
+    elapsed = time.perf_counter() - measure_start
+    stop.set()
+    for t in threads: t.join(timeout=args.timeout)
+
+    report = {
+        "meta": {
+            "started_at": started_at,
+            "git_revision": git_revision(),
+            "url": args.url,
+            "cameras": args.cameras,
+            "fps": args.fps,
+            "duration_s": round(elapsed, 1),
+            "source": [os.path.basename(v) for v in args.video] or "synthetic",
+            "jpeg_quality": args.jpeg_quality,
+            "pollers": not args.no_pollers,
+        },
+        "endpoints": {name: ep.summary(elapsed) for name, ep in stats.items()},
+        "frames": frame_stats.summary(elapsed),
+    }
+
+    print_report(report)
+    output = args.output or f"load_report_{datetime.datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Report saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
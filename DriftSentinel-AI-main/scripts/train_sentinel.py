@@ -0,0 +1,330 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+import torch.nn as nn
+from PIL import Image
+from torch.utils.data import DataLoader, Dataset, IterableDataset, get_worker_info
+
+# SentinelVAE lives in sentinel_core.py, one level up
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from sentinel_core import SentinelVAE
+
+# CONFIGURATION (defaults, all overridable from the command line)
+SOURCES = ["data/normal"]                      # Video files and/or image folders of NORMAL site footage
+CACHE_DIR = "data/cache"                       # Memory-mapped uint8 frame cache
+OUTPUT_MODEL = "models/sentinel_model.pth"     # state_dict loaded by DriftMonitor
+CHECKPOINT = "models/sentinel_checkpoint.pt"   # Resumable training state
+IMG_SIZE = 256                                 # Must match DriftMonitor's Resize((256, 256))
+FRAME_STRIDE = 5                               # Keep every Nth video frame (neighbours are near-duplicates)
+CHUNK_FRAMES = 3000                            # Long videos are split into ranges this long, one per decode task
+EPOCHS = 20
+BATCH_SIZE = 32
+LEARNING_RATE = 1e-3
+
+VIDEO_EXTS = {".mp4", ".avi", ".mov", ".mkv"}
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+# --- 1. SOURCE DISCOVERY ---
+def discover_sources(paths):
+    """Expands folders into a sorted list of video / image files."""
+    files = []
+    for p in map(Path, paths):
+        candidates = sorted(p.rglob("*")) if p.is_dir() else [p]
+        files.extend(str(f) for f in candidates
+                     if f.is_file() and f.suffix.lower() in VIDEO_EXTS | IMAGE_EXTS)
+    if not files:
+        raise SystemExit(f"❌ No videos or images found in {paths}")
+    return files
+
+def is_video(path):
+    return Path(path).suffix.lower() in VIDEO_EXTS
+
+# --- 2. DECODE STREAM (multi-worker, resize on the decode side) ---
+def video_frame_count(path):
+    cap = cv2.VideoCapture(path)
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return max(count, 0)
+
+def plan_tasks(files, stride, chunk_frames):
+    """
+    Decode tasks (path, start, end): one per image, and one per frame range of
+    each video, so a single long shift recording is spread over all workers.
+    Ranges start on a multiple of the stride; end=None reads to the end of the
+    file (frame counts in container headers are only estimates).
+    """
+    chunk = max(stride, chunk_frames // stride * stride)
+    tasks = []
+    for path in files:
+        count = video_frame_count(path) if is_video(path) else 0
+        starts = list(range(0, count, chunk)) or [0]
+        for i, start in enumerate(starts):
+            end = starts[i + 1] if i + 1 < len(starts) else None
+            tasks.append((path, start, end))
+    return tasks
+
+class DecodeStream(IterableDataset):
+    """
+    Yields 256x256 RGB uint8 frames. Decode tasks (images and video frame
+    ranges) are split round-robin across DataLoader workers.
+    """
+    def __init__(self, tasks, stride, size):
+        self.tasks, self.stride, self.size = tasks, stride, size
+
+    def __iter__(self):
+        info = get_worker_info()
+        worker_id, n_workers = (info.id, info.num_workers) if info else (0, 1)
+        for path, start, end in self.tasks[worker_id::n_workers]:
+            frames = self._video(path, start, end) if is_video(path) else self._image(path)
+            yield from frames
+
+    def _video(self, path, start, end):
+        cap = cv2.VideoCapture(path)
+        if start and not (cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+                          and int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == start):
+            # Backend cannot seek exactly: skip forward frame by frame instead
+            cap.release()
+            cap = cv2.VideoCapture(path)
+            for _ in range(start):
+                if not cap.grab(): break
+        index = start
+        while end is None or index < end:
+            # grab() skips the colour conversion/copy for frames we do not keep
+            if not cap.grab(): break
+            if index % self.stride == 0:
+                ok, frame = cap.retrieve()
+                if not ok: break
+                frame = cv2.resize(frame, (self.size, self.size), interpolation=cv2.INTER_AREA)
+                yield np.ascontiguousarray(frame[:, :, ::-1])  # BGR -> RGB
+            index += 1
+        cap.release()
+
+    def _image(self, path):
+        try:
+            img = Image.open(path)
+            # JPEG: decode directly at 1/2, 1/4 or 1/8 scale (DCT scaling), not full size
+            img.draft("RGB", (self.size, self.size))
+            img = img.convert("RGB").resize((self.size, self.size), Image.BILINEAR)
+            yield np.asarray(img, dtype=np.uint8)
+        except Exception as e:
+            print(f"⚠️ Skipping {path}: {e}")
+
+# --- 3. FRAME CACHE (memory-mapped uint8, reused across epochs and runs) ---
+class FrameCache:
+    def __init__(self, cache_dir, files, stride, size, chunk_frames=CHUNK_FRAMES):
+        self.cache_dir = Path(cache_dir)
+        self.files, self.stride, self.size = files, stride, size
+        self.chunk_frames = chunk_frames
+        self.frame_shape = (size, size, 3)
+        self.key = self._key()
+        self.data_path = self.cache_dir / f"frames_{self.key}.u8"
+        self.meta_path = self.cache_dir / f"frames_{self.key}.json"
+
+    def _key(self):
+        """Changes whenever a source file, the stride or the size changes."""
+        h = hashlib.sha1(f"{self.stride}:{self.size}".encode())
+        for f in self.files:
+            st = os.stat(f)
+            h.update(f"{f}:{st.st_size}:{st.st_mtime_ns}".encode())
+        return h.hexdigest()[:16]
+
+    def _estimate(self, tasks):
+        total = 0
+        for path, start, end in tasks:
+            if is_video(path):
+                stop = end if end is not None else video_frame_count(path)
+                total += max(0, stop - start) // self.stride + 1
+            else:
+                total += 1
+        return max(total, 1)
+
+    def _open(self, path, mode, count):
+        return np.memmap(path, dtype=np.uint8, mode=mode, shape=(count,) + self.frame_shape)
+
+    def load_or_build(self, workers):
+        if self.meta_path.exists() and self.data_path.exists():
+            count = json.loads(self.meta_path.read_text())["count"]
+            print(f"✅ Reusing frame cache {self.data_path} ({count} frames)")
+            return self._open(self.data_path, "r", count)
+        return self._build(workers)
+
+    def prune(self):
+        """Deletes caches built for other sources / stride / size (any other key)."""
+        freed = 0
+        for path in self.cache_dir.glob("frames_*"):
+            if path.name.startswith(f"frames_{self.key}."): continue
+            freed += path.stat().st_size
+            path.unlink()
+        if freed:
+            print(f"🧹 Removed stale frame caches ({freed / 1e9:.2f} GB)")
+
+    def _build(self, workers):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.data_path.with_suffix(".tmp")
+        tasks = plan_tasks(self.files, self.stride, self.chunk_frames)
+        capacity = self._estimate(tasks)
+        frame_bytes = int(np.prod(self.frame_shape))
+        store = self._open(tmp_path, "w+", capacity)
+
+        loader = DataLoader(DecodeStream(tasks, self.stride, self.size),
+                            batch_size=None, num_workers=workers)
+        count, started = 0, time.time()
+        print(f"🎞️ Decoding {len(self.files)} sources ({len(tasks)} tasks) with {workers} workers into {tmp_path}...")
+        for frame in loader:
+            if count == capacity:
+                # Frame-count estimate was low: grow the file and remap
+                store.flush(); del store
+                capacity *= 2
+                with open(tmp_path, "r+b") as f: f.truncate(capacity * frame_bytes)
+                store = self._open(tmp_path, "r+", capacity)
+            store[count] = frame.numpy() if torch.is_tensor(frame) else frame
+            count += 1
+        store.flush(); del store
+
+        if count == 0:
+            tmp_path.unlink()
+            raise SystemExit("❌ No frames could be decoded.")
+        with open(tmp_path, "r+b") as f: f.truncate(count * frame_bytes)
+        os.replace(tmp_path, self.data_path)
+        self.meta_path.write_text(json.dumps({"count": count, "shape": self.frame_shape,
+                                              "stride": self.stride, "files": self.files}, indent=2))
+        print(f"✅ Cached {count} frames in {time.time() - started:.1f}s")
+        return self._open(self.data_path, "r", count)
+
+class CachedFrames(Dataset):
+    """Random access into the memmap; the OS page cache keeps hot frames in RAM."""
+    def __init__(self, path, count, shape):
+        self.path, self.count, self.shape = path, count, shape
+        self._data = None
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if self._data is None:  # Open lazily so each worker gets its own mapping
+            self._data = np.memmap(self.path, dtype=np.uint8, mode="r", shape=(self.count,) + self.shape)
+        return torch.from_numpy(np.array(self._data[i]))
+
+# --- 4. CHECKPOINTS ---
+def save_atomic(obj, path):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp = f"{path}.tmp"
+    torch.save(obj, tmp)
+    os.replace(tmp, path)
+
+def load_checkpoint(path, model, optimizer, cache_key):
+    if not os.path.exists(path):
+        return 0, 0
+    ckpt = torch.load(path, map_location="cpu")
+    if ckpt.get("cache_key") != cache_key:
+        print("⚠️ Checkpoint was trained on different data; resuming weights only.")
+        model.load_state_dict(ckpt["model"])
+        return 0, 0
+    model.load_state_dict(ckpt["model"])
+    optimizer.load_state_dict(ckpt["optimizer"])
+    print(f"🔁 Resuming from epoch {ckpt['epoch'] + 1}, batch {ckpt['batch']}")
+    return ckpt["epoch"], ckpt["batch"]
+
+def epoch_order(n, epoch, seed):
+    """Deterministic shuffle per epoch, so a mid-epoch resume sees the same order."""
+    g = torch.Generator().manual_seed(seed + epoch)
+    return torch.randperm(n, generator=g).tolist()
+
+# --- 5. TRAINING ---
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train SentinelVAE on local site footage (CPU friendly).")
+    parser.add_argument("sources", nargs="*", default=SOURCES, help="Video files and/or image folders")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--output", default=OUTPUT_MODEL)
+    parser.add_argument("--checkpoint", default=CHECKPOINT)
+    parser.add_argument("--resume", action="store_true", help="Continue from --checkpoint")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--lr", type=float, default=LEARNING_RATE)
+    parser.add_argument("--stride", type=int, default=FRAME_STRIDE)
+    parser.add_argument("--chunk-frames", type=int, default=CHUNK_FRAMES,
+                        help="Video frames per decode task (long videos are split across workers)")
+    parser.add_argument("--keep-old-caches", action="store_true",
+                        help="Keep caches built for other sources/strides in --cache-dir")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 4))
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="torch intra-op threads")
+    parser.add_argument("--checkpoint-every", type=int, default=200, help="Batches between checkpoints")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    torch.manual_seed(args.seed)
+    torch.set_num_threads(args.threads)
+
+    files = discover_sources(args.sources)
+    cache = FrameCache(args.cache_dir, files, args.stride, IMG_SIZE, args.chunk_frames)
+    frames = cache.load_or_build(args.workers)
+    if not args.keep_old_caches:
+        cache.prune()
+    dataset = CachedFrames(str(cache.data_path), len(frames), cache.frame_shape)
+    del frames
+
+    model = SentinelVAE()
+    optimizer = torch.optim.Adam(model.parameters(), lr=args.lr)
+    criterion = nn.MSELoss()  # Same reconstruction error DriftMonitor scores with
+
+    start_epoch, start_batch = 0, 0
+    if args.resume:
+        start_epoch, start_batch = load_checkpoint(args.checkpoint, model, optimizer, cache.key)
+
+    def checkpoint(epoch, batch):
+        save_atomic({"model": model.state_dict(), "optimizer": optimizer.state_dict(),
+                     "epoch": epoch, "batch": batch, "cache_key": cache.key}, args.checkpoint)
+
+    print(f"🚀 Training on {len(dataset)} frames, {args.threads} threads, {args.workers} loader workers")
+    for epoch in range(start_epoch, args.epochs):
+        skip = start_batch if epoch == start_epoch else 0
+        order = epoch_order(len(dataset), epoch, args.seed)[skip * args.batch_size:]
+        loader = DataLoader(dataset, batch_size=args.batch_size, sampler=order,
+                            num_workers=args.workers, persistent_workers=False,
+                            prefetch_factor=4 if args.workers else None)
+
+        model.train()
+        total_loss, seen = 0.0, 0
+        wait_time, compute_time = 0.0, 0.0
+        tick = time.perf_counter()
+        for batch_idx, batch in enumerate(loader, start=skip):
+            loaded = time.perf_counter()
+            wait_time += loaded - tick
+
+            # uint8 NHWC -> float NCHW in [0, 1] (what ToTensor gives DriftMonitor)
+            x = batch.permute(0, 3, 1, 2).float().div_(255.0)
+            optimizer.zero_grad()
+            loss = criterion(model(x), x)
+            loss.backward()
+            optimizer.step()
+
+            total_loss += loss.item() * len(x)
+            seen += len(x)
+            tick = time.perf_counter()
+            compute_time += tick - loaded
+
+            if (batch_idx + 1) % args.checkpoint_every == 0:
+                checkpoint(epoch, batch_idx + 1)
+
+        checkpoint(epoch + 1, 0)
+        elapsed = wait_time + compute_time
+        print(f"Epoch {epoch + 1}/{args.epochs} | loss {total_loss / max(seen, 1) * 1000:.3f} (x1000) | "
+              f"{seen / max(elapsed, 1e-9):.1f} frames/s | waiting on data {wait_time / max(elapsed, 1e-9) * 100:.0f}%")
+
+    # Export exactly what DriftMonitor.load_state_dict expects
+    save_atomic(model.state_dict(), args.output)
+    SentinelVAE().load_state_dict(torch.load(args.output, map_location="cpu"))
+    print(f"✅ Saved {args.output}")
+
+if __name__ == "__main__":
+    main()
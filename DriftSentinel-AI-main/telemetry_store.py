@@ -0,0 +1,183 @@
+import math
+import queue
+import sqlite3
+import threading
+import time
+
+# --- Drift Telemetry Store ---
+# Every scored frame is queued in memory and written by a background thread in
+# batches. Each batch also updates min/max/mean rollups at 1 s, 1 min and 1 h,
+# so a chart over days reads a few hundred pre-aggregated rows, not millions
+# of frames.
+
+METRICS = ("drift", "risk_budget", "workers")
+RESOLUTIONS = (1, 60, 3600)  # Seconds per rollup bucket
+RETENTION = {                # Seconds kept per table (None = forever)
+    "raw": 6 * 3600,
+    1: 7 * 86400,
+    60: 90 * 86400,
+    3600: None,
+}
+SCAN_FACTOR = 60  # A query reads at most max_points * SCAN_FACTOR rollup rows
+
+class TelemetryStore:
+    def __init__(self, path, batch_size=200, flush_interval=1.0, max_queue=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._local = threading.local()
+        self._flushes = 0
+        self._init_schema()
+
+        self._writer = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+        self._writer.start()
+
+    # --- 1. SCHEMA ---
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        metric_cols = ", ".join(f"{m} REAL" for m in METRICS)
+        conn.execute(f"CREATE TABLE IF NOT EXISTS samples (stream TEXT NOT NULL, ts REAL NOT NULL, {metric_cols})")
+        conn.execute("CREATE INDEX IF NOT EXISTS samples_stream_ts ON samples (stream, ts)")
+
+        rollup_cols = ", ".join(f"{m}_min REAL, {m}_max REAL, {m}_sum REAL, {m}_n INTEGER" for m in METRICS)
+        conn.execute(f"""CREATE TABLE IF NOT EXISTS rollups (
+            resolution INTEGER NOT NULL, stream TEXT NOT NULL, bucket INTEGER NOT NULL, {rollup_cols},
+            PRIMARY KEY (resolution, stream, bucket))""")
+
+        # Merge a pre-aggregated batch into an existing bucket (NULL = metric not reported)
+        merge = []
+        for m in METRICS:
+            merge.append(f"{m}_min = CASE WHEN {m}_min IS NULL THEN excluded.{m}_min "
+                         f"WHEN excluded.{m}_min IS NULL THEN {m}_min ELSE min({m}_min, excluded.{m}_min) END")
+            merge.append(f"{m}_max = CASE WHEN {m}_max IS NULL THEN excluded.{m}_max "
+                         f"WHEN excluded.{m}_max IS NULL THEN {m}_max ELSE max({m}_max, excluded.{m}_max) END")
+            merge.append(f"{m}_sum = coalesce({m}_sum, 0) + coalesce(excluded.{m}_sum, 0)")
+            merge.append(f"{m}_n = {m}_n + excluded.{m}_n")
+        columns = ["resolution", "stream", "bucket"] + [f"{m}_{s}" for m in METRICS for s in ("min", "max", "sum", "n")]
+        self._upsert_sql = (f"INSERT INTO rollups ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                            f"ON CONFLICT (resolution, stream, bucket) DO UPDATE SET {', '.join(merge)}")
+        self._insert_sql = (f"INSERT INTO samples (stream, ts, {', '.join(METRICS)}) "
+                            f"VALUES ({', '.join('?' * (len(METRICS) + 2))})")
+
+    # --- 2. ASYNC BATCHED WRITER ---
+    def record(self, stream, ts=None, **metrics):
+        """Non-blocking. Unknown metric names are ignored; missing ones are stored as NULL."""
+        row = (stream, ts if ts is not None else time.time()) + tuple(
+            None if metrics.get(m) is None else float(metrics[m]) for m in METRICS)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1  # Never stall the video loop on telemetry
+
+    def flush(self, timeout=5.0):
+        """Blocks until everything queued so far is on disk."""
+        done = threading.Event()
+        self._queue.put(done, timeout=timeout)
+        done.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    self._write(batch)
+                except sqlite3.Error as e:
+                    print(f"⚠️ Telemetry write failed: {e}")
+            for w in waiters: w.set()
+
+    def _write(self, batch):
+        # Pre-aggregate in Python so each bucket is one upsert, not one per frame
+        agg = {}
+        for row in batch:
+            stream, ts, values = row[0], row[1], row[2:]
+            for res in RESOLUTIONS:
+                key = (res, stream, int(ts // res) * res)
+                acc = agg.get(key)
+                if acc is None:
+                    acc = agg[key] = [[None, None, 0.0, 0] for _ in METRICS]
+                for i, v in enumerate(values):
+                    if v is None: continue
+                    a = acc[i]
+                    a[0] = v if a[0] is None else min(a[0], v)
+                    a[1] = v if a[1] is None else max(a[1], v)
+                    a[2] += v
+                    a[3] += 1
+
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(self._insert_sql, batch)
+            conn.executemany(self._upsert_sql, [
+                key + tuple(v for lo, hi, total, n in acc for v in (lo, hi, total if n else None, n))
+                for key, acc in agg.items()])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        self._flushes += 1
+        if self._flushes % 100 == 0:
+            self._prune()
+
+    def _prune(self):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("DELETE FROM samples WHERE ts < ?", (now - RETENTION["raw"],))
+        for res in RESOLUTIONS:
+            if RETENTION[res] is not None:
+                conn.execute("DELETE FROM rollups WHERE resolution = ? AND bucket < ?", (res, now - RETENTION[res]))
+
+    # --- 3. RANGE QUERIES ---
+    def query(self, stream, start, end, max_points=500):
+        """
+        Returns at most ~max_points points covering [start, end].
+        Reads the finest retained rollup whose row count stays within
+        max_points * SCAN_FACTOR, then merges neighbouring buckets down to
+        about max_points.
+        """
+        span = max(end - start, 1.0)
+        now = time.time()
+        usable = [r for r in RESOLUTIONS if RETENTION[r] is None or start >= now - RETENTION[r]]
+        resolution = next((r for r in usable if span / r <= max_points * SCAN_FACTOR), usable[-1])
+        width = resolution * max(1, math.ceil(span / (resolution * max_points)))
+
+        cols = ", ".join(f"min({m}_min), max({m}_max), sum({m}_sum), sum({m}_n)" for m in METRICS)
+        rows = self._conn().execute(
+            f"SELECT (bucket / ?) * ? AS t, {cols} FROM rollups "
+            f"WHERE resolution = ? AND stream = ? AND bucket >= ? AND bucket <= ? "
+            f"GROUP BY t ORDER BY t",
+            (width, width, resolution, stream, int(start // resolution) * resolution, int(end))).fetchall()
+
+        points = []
+        for row in rows:
+            point = {"t": row[0]}
+            for i, m in enumerate(METRICS):
+                lo, hi, total, n = row[1 + 4 * i: 5 + 4 * i]
+                point[m] = {"min": lo, "max": hi, "mean": total / n} if n else None
+            points.append(point)
+        return {"stream": stream, "start": start, "end": end, "resolution_s": width, "points": points}
+
+    def streams(self):
+        return [r[0] for r in self._conn().execute("SELECT DISTINCT stream FROM rollups WHERE resolution = 3600")]
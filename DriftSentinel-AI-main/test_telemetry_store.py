@@ -0,0 +1,33 @@
+import time
+
+import pytest
+
+from telemetry_store import TelemetryStore
+
+HOURS = 24
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    # One sample per second for the last 24 h
+    store = TelemetryStore(str(tmp_path_factory.mktemp("telemetry") / "telemetry.db"), max_queue=HOURS * 3600 + 1)
+    now = time.time()
+    for i in range(HOURS * 3600):
+        store.record("cam1", ts=now - i, drift=i % 100, risk_budget=100.0)
+    store.flush(timeout=120)
+    return store, now
+
+@pytest.mark.parametrize("hours, max_points", [(2, 100), (24, 500), (24, 100)])
+def test_query_returns_close_to_max_points(store, hours, max_points):
+    store, now = store
+    result = store.query("cam1", now - hours * 3600, now, max_points)
+    # Buckets are merged in whole rollup units, so at least half of max_points
+    # (plus one partial bucket at the window edge)
+    assert max_points // 2 <= len(result["points"]) <= max_points + 1
+    assert result["resolution_s"] * max_points >= hours * 3600
+
+def test_query_aggregates_min_max_mean(store):
+    store, now = store
+    result = store.query("cam1", now - 3600, now, 60)
+    point = result["points"][len(result["points"]) // 2]
+    assert point["drift"]["min"] == 0 and point["drift"]["max"] == 99
+    assert point["risk_budget"]["mean"] == pytest.approx(100.0)
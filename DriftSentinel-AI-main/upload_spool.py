@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Upload Spool ---
+# Uploaded recordings are copied to disk in fixed-size chunks (never the whole
+# file in memory) and stored under their SHA-256, so the same shift recording
+# uploaded twice, or by another session, is kept once and replayed from disk.
+# The spool stays under a byte quota by evicting the least recently used
+# recordings; recordings being played are pinned and never evicted.
+
+CHUNK_SIZE = 1 << 20             # 1 MB per read/write
+STALE_PARTIAL_SECONDS = 3600     # Leftover .partial files older than this are from dead runs
+
+class UploadSpool:
+    def __init__(self, root, quota_bytes, chunk_size=CHUNK_SIZE):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()  # Streamlit sessions are threads of one process
+        self._pins = {}                # recording id -> active leases
+        os.makedirs(root, exist_ok=True)
+        self._sweep_partials()
+
+    # --- 1. INGEST ---
+    def ingest(self, fileobj, name, size=None):
+        """
+        Streams a file-like object into the spool and returns its entry.
+        Raises ValueError if the file can never fit in the quota or on disk.
+        Older recordings are only evicted once the content is known to be new.
+        """
+        if size is not None:
+            self._check_fits(size)
+
+        ext = os.path.splitext(name)[1].lower() or ".mp4"
+        fd, partial = tempfile.mkstemp(dir=self.root, suffix=".partial")
+        try:
+            sha, written = hashlib.sha256(), 0
+            if hasattr(fileobj, "seek"): fileobj.seek(0)  # Streamlit reruns reuse the same object
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = fileobj.read(self.chunk_size)
+                    if not chunk: break
+                    written += len(chunk)
+                    if written > self.quota_bytes:
+                        raise ValueError(f"{name} is larger than the upload quota "
+                                         f"({self.quota_bytes / 1e9:.1f} GB)")
+                    sha.update(chunk)
+                    out.write(chunk)
+
+            entry_id = sha.hexdigest()
+            path = os.path.join(self.root, entry_id + ext)
+            if not os.path.exists(path):
+                self._make_room(written)
+            with self._lock:
+                if os.path.exists(path):
+                    os.remove(partial)  # Already spooled: keep the existing copy
+                else:
+                    os.replace(partial, path)
+                self._write_meta(entry_id, {"name": name, "file": os.path.basename(path),
+                                            "size": written, "added": time.time()})
+                os.utime(path)  # Counts as a use for LRU eviction
+        finally:
+            if os.path.exists(partial): os.remove(partial)
+
+        return self.get(entry_id)
+
+    # --- 2. LOOKUP & LEASES ---
+    def _meta_path(self, entry_id):
+        return os.path.join(self.root, entry_id + ".json")
+
+    def _write_meta(self, entry_id, meta):
+        tmp = self._meta_path(entry_id) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._meta_path(entry_id))
+
+    def get(self, entry_id):
+        try:
+            with open(self._meta_path(entry_id)) as f:
+                meta = json.load(f)
+            path = os.path.join(self.root, meta["file"])
+            last_used = os.path.getmtime(path)
+        except (OSError, ValueError):
+            return None
+        return {"id": entry_id, "path": path, "name": meta["name"], "size": meta["size"],
+                "last_used": last_used}
+
+    def recordings(self):
+        """All spooled recordings, most recently used first."""
+        entries = [self.get(f[:-5]) for f in os.listdir(self.root) if f.endswith(".json")]
+        return sorted((e for e in entries if e), key=lambda e: e["last_used"], reverse=True)
+
+    @contextmanager
+    def lease(self, entry_id):
+        """Yields the recording's path; it cannot be evicted until the block exits."""
+        with self._lock:
+            entry = self.get(entry_id)
+            if entry is None:
+                raise KeyError(f"Recording {entry_id} is no longer in the spool")
+            self._pins[entry_id] = self._pins.get(entry_id, 0) + 1
+            os.utime(entry["path"])
+        try:
+            yield entry["path"]
+        finally:
+            with self._lock:
+                self._pins[entry_id] -= 1
+                if not self._pins[entry_id]: del self._pins[entry_id]
+
+    # --- 3. QUOTA ---
+    def _check_fits(self, incoming):
+        """Rejects an upload up front without evicting anything."""
+        if incoming > self.quota_bytes:
+            raise ValueError(f"Upload is larger than the upload quota ({self.quota_bytes / 1e9:.1f} GB)")
+        free = shutil.disk_usage(self.root).free
+        if incoming > free:
+            raise ValueError(f"Not enough disk space for the upload ({free / 1e9:.1f} GB free)")
+
+    def _make_room(self, incoming):
+        """Evicts least recently used, unpinned recordings until `incoming` more bytes fit the quota."""
+        with self._lock:
+            entries = self.recordings()
+            used = sum(e["size"] for e in entries)
+            for entry in reversed(entries):  # Least recently used first
+                if used + incoming <= self.quota_bytes: break
+                if entry["id"] in self._pins: continue
+                if self._remove(entry): used -= entry["size"]
+
+    def _remove(self, entry):
+        try:
+            os.remove(entry["path"])
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # e.g. Windows still holds the file open; retried on the next eviction
+            print(f"⚠️ Could not evict {entry['name']}: {e}")
+            return False
+        os.remove(self._meta_path(entry["id"]))
+        return True
+
+    def _sweep_partials(self):
+        now = time.time()
+        for f in os.listdir(self.root):
+            path = os.path.join(self.root, f)
+            if f.endswith((".partial", ".tmp")) and now - os.path.getmtime(path) > STALE_PARTIAL_SECONDS:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"⚠️ Could not remove {path}: {e}")
+
+    def stats(self):
+        entries = self.recordings()
+        return {"recordings": len(entries), "used_bytes": sum(e["size"] for e in entries),
+                "quota_bytes": self.quota_bytes, "pinned": len(self._pins)}